@@ -1,4 +1,9 @@
 import os, sys, random
+from array import array
+
+# the screen module is shared by all the games and lives in the folder above
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import screen, profiling
 
 config = {
     'suits' : {
@@ -12,13 +17,13 @@ config = {
         'king' : 10,
         'queen' : 10,
         'jack' : 10
-    }
-}
-
-commands = {
-    'clear' : {
-        'win32' : 'cls',
-        'cygwin' : 'cls'
+    },
+    # tags each card counting system gives to the values ace to ten
+    'counting' : {
+        'hi-lo' : (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1),
+        'ko' : (-1, 1, 1, 1, 1, 1, 1, 0, 0, -1),
+        'hi-opt-1' : (0, 0, 1, 1, 1, 1, 0, 0, 0, -1),
+        'omega-2' : (0, 1, 1, 2, 2, 2, 1, 0, -1, -2)
     }
 }
 
@@ -72,45 +77,154 @@ class CardCollection:
     def size(self):
         return len(self.cards)
 
+# deal numbers are 64 bit, from 0 up to but not including MAX_DEAL
+MAX_DEAL = 2 ** 64
+
+'''
+Function reading a deal number typed by the player, in decimal or with a 0x, 0o or 0b prefix
+    raises ValueError when the text is not a number or not a 64 bit deal number
+'''
+def parse_deal(text):
+    try:
+        deal = int(text, 0)
+    except ValueError:
+        raise ValueError(f'{text!r} is not a deal number') from None
+    check_deal(deal)
+    return deal
+
+# raises ValueError for a deal number which is not 64 bit, None is left for a random deal
+def check_deal(deal):
+    if deal is not None and not 0 <= deal < MAX_DEAL:
+        raise ValueError(f'a deal number is from 0 to {MAX_DEAL - 1}')
+
 '''
 Class for Deck object
     inherits from the CardCollection class
+    deal is the 64 bit number the deck is shuffled with, the same number always gives the same deal
 '''
 class Deck(CardCollection):
-    def __init__(self):
+    def __init__(self, deal = None):
         super().__init__()
+        check_deal(deal)
+        self.deal = random.getrandbits(64) if deal is None else deal
+        self.random = random.Random(self.deal)
         for suit in config['suits']:
             for special in config['special']:
                 self.add(Card(suit, special))
             for value in range(2, 11):
                 self.add(Card(suit, value))
 
+    def shuffle(self):
+        self.random.shuffle(self.cards)
+
     def draw(self):
         return self.cards.pop()
 
+# one of every card, in the same order as an unshuffled Deck
+CARDS = Deck(0).cards
+
+# index of each card's value in a composition, 0 for an ace up to 9 for a ten or picture card
+def value_index(card):
+    value = card.get_value()
+    return 0 if value == -1 else value - 1
+
+VALUE_INDEXES = [value_index(card) for card in CARDS]
+
+# most decks a shoe can hold, so every count in a composition fits in COUNT_BITS
+MAX_DECKS = 255
+
+'''
+Class for Shoe object
+    holds one or more decks as an array of indexes into CARDS, so dealing never creates cards
+    and reshuffling is an in-place shuffle of the indexes
+    penetration is how far through the shoe the cut card is, once it is reached the shoe is
+    reshuffled before the next round
+    counts is the composition of the cards left, how many of each value from ace to ten
+    a one deck shoe deals the same cards as Deck for the same deal number
+'''
+class Shoe:
+    def __init__(self, decks = 1, penetration = 0.75, deal = None):
+        if not 1 <= decks <= MAX_DECKS:
+            raise ValueError(f'a shoe holds 1 to {MAX_DECKS} decks')
+        check_deal(deal)
+        self.decks = decks
+        self.deal = random.getrandbits(64) if deal is None else deal
+        self.random = random.Random(self.deal)
+        self.cards = array('B', range(len(CARDS))) * decks
+        self.cut = int(len(self.cards) * penetration)
+        self.position = 0
+        self.counts = self.full_counts()
+
+    def __str__(self):
+        return f'Shoe of {self.decks} deck(s), {self.size()} cards left.'
+
+    def full_counts(self):
+        counts = [0] * 10
+        for index in VALUE_INDEXES:
+            counts[index] += self.decks
+        return counts
+
+    def shuffle(self):
+        self.random.shuffle(self.cards)
+        self.position = 0
+        self.counts = self.full_counts()
+
+    def needs_shuffle(self):
+        return self.position >= self.cut
+
+    # deals from the end of the array like Deck.draw, running out part way through a round reshuffles the whole shoe
+    def draw(self):
+        if self.position >= len(self.cards):
+            self.shuffle()
+        self.position += 1
+        index = self.cards[-self.position]
+        self.counts[VALUE_INDEXES[index]] -= 1
+        return CARDS[index]
+
+    def size(self):
+        return len(self.cards) - self.position
+
 '''
 Class for Hand object
     inherits from the CardCollection class
+    keeps a running hard total (aces as 1) and count of aces as cards are added and removed,
+    so the value of the hand never needs to be worked out from the cards again
 '''
 class Hand(CardCollection):
     def __init__(self):
         super().__init__()
+        self.total = 0
+        self.aces = 0
+
+    def add(self, card):
+        super().add(card)
+        if type(card) == Card:
+            self.count(card, 1)
+
+    def remove(self, card):
+        if card in self.cards:
+            self.count(card, -1)
+        super().remove(card)
+
+    # empties the hand so the same object can be used for the next round
+    def clear(self):
+        self.cards.clear()
+        self.total = 0
+        self.aces = 0
+
+    def count(self, card, sign):
+        value = card.get_value()
+        if value == -1:
+            self.aces += sign
+            value = 1
+        self.total += value * sign
+
+    # only one ace can ever count as 11, two would already be 22
+    def is_soft(self):
+        return self.aces > 0 and self.total + 10 <= 21
 
     def hand_value(self):
-        total, aces = 0, []
-        for card in sorted(self.cards, key = lambda x: x.get_value(), reverse = True):
-            if card.get_value() == -1:
-                aces.append(card)
-            else:
-                total += card.get_value()
-        for ace in aces:
-            if total + 11 <= 21 and len(aces[aces.index(ace) + 1:]) == 1:
-                total += 11
-            elif total + 11 <= 21:
-                total += 11
-            else:
-                total += 1
-        return total
+        return self.total + 10 if self.is_soft() else self.total
 
 '''
 Class for Player object
@@ -136,6 +250,7 @@ class Player:
 '''
 Class for Dealer object
     inherits from the Player class
+    deals from anything with a draw method, a Deck or a Shoe
 '''
 class Dealer(Player):
     def __init__(self):
@@ -145,24 +260,244 @@ class Dealer(Player):
         for i in range(quantity):
             player.hand.add(deck.draw())
 
+    # chances of each way the dealer's hand can finish, as seen by the players
+    # the dealer's hole card is still unknown to them so it is put back into the shoe's counts
+    def outcomes(self, shoe, peeked = False):
+        counts = list(shoe.counts)
+        for card in self.hand.cards[1:]:
+            counts[value_index(card)] += 1
+        up = value_index(self.hand.cards[0]) + 1
+        return dict(zip(DEALER_OUTCOMES, dealer_probabilities(up, counts, peeked)))
+
+# every way the dealer's hand can finish, the order of the probabilities from dealer_probabilities
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, 'bust', 'blackjack')
+
+# positions already worked out, keyed by the dealer's hand and the packed composition of the shoe
+dealer_cache = {}
+DEALER_CACHE_SIZE = 1000000
+
+# bits each value gets in a packed composition, enough for the 16 tens in each of MAX_DECKS decks
+COUNT_BITS = 12
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+'''
+Function packing a composition (how many of each value from ace to ten) into one integer, COUNT_BITS per value
+'''
+def pack_counts(counts):
+    packed = 0
+    for i, count in enumerate(counts):
+        packed |= count << (COUNT_BITS * i)
+    return packed
+
+'''
+Function giving the chances of each finish for a dealer still drawing cards
+    total is the hand with aces counted as 1, packed the composition left and remaining how many cards that is
+    the dealer stands on every 17, the same as the game
+'''
+def dealer_finish(total, ace, packed, remaining):
+    value = total + 10 if ace and total + 10 <= 21 else total
+    if value > 21:
+        return (0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+    if value >= 17:
+        result = [0.0] * 7
+        result[value - 17] = 1.0
+        return tuple(result)
+    key = (total, ace, packed)
+    result = dealer_cache.get(key)
+    if result is not None:
+        return result
+    result = [0.0] * 7
+    for i in range(10):
+        count = (packed >> (COUNT_BITS * i)) & COUNT_MASK
+        if count:
+            chance = count / remaining
+            finish = dealer_finish(total + i + 1, ace or i == 0, packed - (1 << (COUNT_BITS * i)), remaining - 1)
+            for j in range(7):
+                result[j] += chance * finish[j]
+    result = tuple(result)
+    dealer_cache[key] = result
+    return result
+
+'''
+Function giving the exact chances of each way the dealer's hand finishes, in the order of DEALER_OUTCOMES
+    up is the value of the dealer's up card (1 for an ace up to 10) and counts how many of each value
+    from ace to ten are left, not counting the up card
+    peeked is True once the dealer has checked their hole card and does not have a blackjack
+'''
+def dealer_probabilities(up, counts, peeked = False):
+    packed = pack_counts(counts)
+    key = (up, packed, peeked)
+    result = dealer_cache.get(key)
+    if result is not None:
+        return result
+    if len(dealer_cache) > DEALER_CACHE_SIZE:
+        dealer_cache.clear()
+    remaining = sum(counts)
+    result = [0.0] * 7
+    weight = 0
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        hole = i + 1
+        if (up == 1 and hole == 10) or (up == 10 and hole == 1):
+            # the hole card makes a blackjack, which cannot happen once the dealer has peeked
+            if not peeked:
+                result[6] += count
+                weight += count
+            continue
+        finish = dealer_finish(up + hole, up == 1 or hole == 1, packed - (1 << (COUNT_BITS * i)), remaining - 1)
+        for j in range(7):
+            result[j] += count * finish[j]
+        weight += count
+    result = tuple(chance / weight for chance in result)
+    dealer_cache[key] = result
+    return result
+
+'''
+Function estimating the chance of each way the dealer finishes (17-21 then bust) when every card is drawn
+with the chances in p, for ace up to ten
+    unlike dealer_probabilities the composition is not changed by the dealer's own cards, which keeps it
+    fast enough to work out again whenever a card is dealt
+    up is the dealer's up card (1 for an ace up to 10), or None when none of their cards can be seen,
+    with an up card the dealer is taken to have peeked and not have a blackjack
+'''
+def dealer_estimate(up, p):
+    memo = {}
+
+    def finish(total, ace):
+        value = total + 10 if ace and total + 10 <= 21 else total
+        result = [0.0] * 6
+        if value > 21:
+            result[5] = 1.0
+        elif value >= 17:
+            result[value - 17] = 1.0
+        elif (total, ace) in memo:
+            return memo[(total, ace)]
+        else:
+            for i in range(10):
+                if p[i]:
+                    drawn = finish(total + i + 1, ace or i == 0)
+                    for j in range(6):
+                        result[j] += p[i] * drawn[j]
+            memo[(total, ace)] = result
+        return result
+
+    if up is None:
+        return finish(0, False)
+    result, weight = [0.0] * 6, 0.0
+    for i in range(10):
+        hole = i + 1
+        if not p[i] or (up == 1 and hole == 10) or (up == 10 and hole == 1):
+            continue
+        drawn = finish(up + hole, up == 1 or hole == 1)
+        for j in range(6):
+            result[j] += p[i] * drawn[j]
+        weight += p[i]
+    return [chance / weight for chance in result]
+
+'''
+Function giving the expected value of each move for a hand, as a dictionary of move to the average won per unit bet
+    counts is the composition the player has not seen, how many of each value from ace to ten
+    hitting is valued as hitting once and then playing on as well as possible
+'''
+def move_values(hand, up, counts, can_double = False):
+    remaining = sum(counts)
+    p = [count / remaining for count in counts]
+    dealer = dealer_estimate(up, p)
+    # standing on each value, anything under 17 only wins when the dealer busts
+    stand = []
+    for value in range(22):
+        beaten = sum(dealer[j] for j in range(5) if 17 + j < value)
+        beats = sum(dealer[j] for j in range(5) if 17 + j > value)
+        stand.append(dealer[5] + beaten - beats)
+    memo = {}
+
+    def best(total, ace):
+        value = total + 10 if ace and total + 10 <= 21 else total
+        if value > 21:
+            return -1.0
+        if (total, ace) not in memo:
+            memo[(total, ace)] = max(stand[value], hit(total, ace)) if value < 21 else stand[value]
+        return memo[(total, ace)]
+
+    def hit(total, ace):
+        return sum(p[i] * best(total + i + 1, ace or i == 0) for i in range(10) if p[i])
+
+    total, ace = hand.total, hand.aces > 0
+    values = {'stand' : stand[hand.hand_value()], 'hit' : hit(total, ace)}
+    if can_double:
+        double = 0.0
+        for i in range(10):
+            value = total + i + 1
+            value = value + 10 if (ace or i == 0) and value + 10 <= 21 else value
+            double += p[i] * (stand[value] if value <= 21 else -1.0)
+        values['double'] = 2 * double
+    return values
+
+'''
+Class for a Counter keeping the count of the cards a player has seen with one of the counting systems in config
+'''
+class Counter:
+    def __init__(self, system = 'hi-lo'):
+        self.system = system
+        self.tags = config['counting'][system]
+        self.running = 0
+
+    def reset(self):
+        self.running = 0
+
+    def see(self, card):
+        self.running += self.tags[value_index(card)]
+
+    # the running count for each deck still to be dealt
+    def true_count(self, cards_left):
+        return self.running / max(cards_left / 52, 0.5)
+
+    # line of advice for the hand, the count and the value of each move with the best first
+    def hint(self, hand, up, counts, cards_left, can_double = False):
+        values = sorted(move_values(hand, up, counts, can_double).items(), key = lambda item: item[1], reverse = True)
+        return (f'Hint ({self.system}): running count {self.running:+}, true count {self.true_count(cards_left):+.1f} - '
+                + ', '.join(f'{move} {value:+.3f}' for move, value in values))
+
 '''
 Class for the Game object
 '''
 class Game:
-    def __init__(self):
-        self.deck = Deck()
+    prompt = '- What would you like to do? (\'hit\' or \'stand\'): '
+
+    def __init__(self, deal = None, decks = 1, hints = None):
+        self.shoe = Shoe(decks, deal = deal)
         self.player = Player()
         self.dealer = Dealer()
+        # counting system to give hints with, None for no hints
+        self.counter = Counter(hints) if hints else None
         self.round = 1
+        self.finished = False
+        # what happened in the last step, for playing without a screen
+        self.events = []
         self.output = ( f"{' '.join(config['suits'].values())} Blackjack - %%round%%\n"
                         'Current hand (%%hand_value%%): %%player_hand%%\n'
                         'Dealers hand: x%%dealer_hand_size%% cards\n'
                         'Cards in deck: x%%deck_size%%\n')
 
     def setup(self):
-        self.deck.shuffle()
-        self.dealer.deal(self.deck, self.player, 2)
-        self.dealer.deal(self.deck, self.dealer, 2)
+        self.shoe.shuffle()
+        self.dealer.deal(self.shoe, self.player, 2)
+        self.dealer.deal(self.shoe, self.dealer, 2)
+        self.count(self.player.hand.cards)
+
+    # counts the cards the player has seen, the dealer's cards are never shown
+    def count(self, cards):
+        if self.counter:
+            for card in cards:
+                self.counter.see(card)
+
+    # hint for the player's hand, the dealer's cards are hidden so they are still unseen cards
+    def hint(self):
+        counts = list(self.shoe.counts)
+        for card in self.dealer.hand.cards:
+            counts[value_index(card)] += 1
+        return self.counter.hint(self.player.hand, None, counts, sum(counts))
 
     def update_output(self):
         updated_output = self.output[:]
@@ -171,72 +506,154 @@ class Game:
             '%%player_hand%%' : self.player.hand,
             '%%hand_value%%' : self.player.hand.hand_value(),
             '%%dealer_hand_size%%' : self.dealer.hand.size(),
-            '%%deck_size%%' : self.deck.size()
+            '%%deck_size%%' : self.shoe.size()
         }
         for tag, value in context.items():
             updated_output = updated_output.replace(tag, str(value))
+        if self.counter and self.player.hand.hand_value() < 21:
+            updated_output += self.hint() + '\n'
         return updated_output
 
     def display(self):
-        os.system(commands['clear'].get(sys.platform, 'clear'))
-        print(self.update_output())
+        screen.show(self.update_output())
+
+    # checks if the game is over, returns the result or None if the game carries on
+    def result(self):
+        # check hands to see if either player or dealer has bust
+        self.player.hand_check()
+        self.dealer.hand_check()
+
+        if self.player.is_bust() and self.dealer.is_bust():
+            return 'It is a draw, both you and the dealer have bust.'
+        elif self.player.is_bust():
+            return 'You have bust, you have lost the game.'
+        elif self.dealer.is_bust():
+            return 'The dealer has bust, you have won the game!'
+
+        # check if either player or dealer has blackjack
+        if self.player.hand.hand_value() == 21:
+            return 'You have a blackjack! You win the game!'
+        elif self.dealer.hand.hand_value() == 21:
+            return 'The dealer has a blackjack, you have lost the game.'
+
+        # check if both the player and the dealer are standing
+        if self.player.is_standing() and self.dealer.is_standing():
+            if self.player.hand.hand_value() > self.dealer.hand.hand_value():
+                return 'You have a higher value hand than the dealer! You have won the game!'
+            elif self.player.hand.hand_value() < self.dealer.hand.hand_value():
+                return 'The dealer has a higher value hand than you, you have lost the game.'
+            else:
+                return 'It is a draw, both you and the dealer have the same value hand.'
+        return None
 
-    def loop(self):
-        # main game loop
+    # plays rounds until the player has to choose or the game is over, returns the screen to show
+    # without render nothing is drawn and only the events are kept
+    def step(self, render = True):
         while True:
-            self.display()
-
-            # check hands to see if either player or dealer has bust
-            self.player.hand_check()
-            self.dealer.hand_check()
-
-            if self.player.is_bust() and self.dealer.is_bust():
-                print('It is a draw, both you and the dealer have bust.')
-                break
-            elif self.player.is_bust():
-                print('You have bust, you have lost the game.')
-                break
-            elif self.dealer.is_bust():
-                print('The dealer has bust, you have won the game!')
-                break
-
-            # check if either player or dealer has blackjack
-            if self.player.hand.hand_value() == 21:
-                print('You have a blackjack! You win the game!')
-                break
-            elif self.dealer.hand.hand_value() == 21:
-                print('The dealer has a blackjack, you have lost the game.')
-                break
-
-            # check if both the player and the dealer are standing
-            if self.player.is_standing() and self.dealer.is_standing():
-                if self.player.hand.hand_value() > self.dealer.hand.hand_value():
-                    print('You have a higher value hand than the dealer! You have won the game!')
-                elif self.player.hand.hand_value() < self.dealer.hand.hand_value():
-                    print('The dealer has a higher value hand than you, you have lost the game.')
-                else:
-                    print('It is a draw, both you and the dealer have the same value hand.')
-                break
+            output = self.update_output() if render else ''
+            result = self.result()
+            if result is not None:
+                self.finished = True
+                self.events.append(('result', result))
+                return output + result
 
             # dealer will hit unless their hand value is more than or equal to 17
             if self.dealer.hand.hand_value() <= 16:
-                self.dealer.deal(self.deck, self.dealer)
+                self.dealer.deal(self.shoe, self.dealer)
+                self.events.append(('dealer_hits',))
             else:
                 self.dealer.set_stand()
+                self.events.append(('dealer_stands',))
 
             # player can input hit or stand - as long as they're not all ready standing
             if not self.player.is_standing():
-                move = input('- What would you like to do? (\'hit\' or \'stand\'): ')
-                if move.lower() == 'hit':
-                    self.dealer.deal(self.deck, self.player)
-                elif move.lower() == 'stand':
-                    self.player.set_stand()
+                return output
 
             # incremenet the round value
             self.round += 1
 
+    # applies the players choice then carries on playing, returns the screen to show
+    def command(self, move, render = True):
+        self.events = []
+        if move.lower() == 'hit':
+            self.dealer.deal(self.shoe, self.player)
+            self.count(self.player.hand.cards[-1:])
+            self.events.append(('hit', str(self.player.hand.cards[-1])))
+        elif move.lower() == 'stand':
+            self.player.set_stand()
+            self.events.append(('stand',))
+        self.round += 1
+        return self.step(render)
+
+    def loop(self):
+        # main game loop, each pass is timed when profiling is on, leaving out the wait for the player
+        with profiling.section('blackjack.loop'):
+            screen.show(self.step())
+        while not self.finished:
+            move = input(Game.prompt)
+            with profiling.section('blackjack.loop'):
+                screen.show(self.command(move))
+
+'''
+Class for a game played a line at a time, so it can be driven by the server
+'''
+class Session:
+    prompt = Game.prompt
+
+    def __init__(self, terminal = True, deal = None):
+        self.game = Game(deal)
+        self.terminal = terminal
+        self.finished = False
+
+    def start(self):
+        self.game.setup()
+        return self.page(self.game.step())
+
+    def handle(self, line):
+        with profiling.section('blackjack.command'):
+            return self.page(self.game.command(line))
+
+    def page(self, output):
+        self.finished = self.game.finished
+        return screen.page(output, self.terminal)
+
+'''
+Headless game for bots, tests and replaying recorded commands
+    new_game gives the state and events of a new game, step plays one command on it
+    each event is a tuple starting with its name, nothing is drawn
+'''
+def new_game(deal = None):
+    game = Game(deal)
+    game.setup()
+    game.step(False)
+    return game, game.events
+
+def step(game, command):
+    if game.finished:
+        return game, []
+    game.command(command, False)
+    return game, game.events
+
 def main():
-    game = Game()
+    # a deal number can be given to play a particular deal again, and --hints with a counting system shows hints
+    # --profile records where the time goes
+    args = profiling.take_flag(sys.argv[1:])
+    usage = f'Usage: python3 main.py [deal number] [--hints [{"|".join(config["counting"])}]] [--profile]'
+    hints = None
+    if '--hints' in args:
+        index = args.index('--hints')
+        del args[index]
+        # the counting system can be left out for hi-lo, a number after --hints is the deal rather than a system
+        hints = 'hi-lo'
+        if index < len(args) and not args[index][:1].isdigit():
+            hints = args.pop(index)
+            if hints not in config['counting']:
+                sys.exit(f'{usage}: {hints!r} is not a counting system')
+    try:
+        deal = parse_deal(args[0]) if args else None
+    except ValueError as error:
+        sys.exit(f'{usage}: {error}')
+    game = Game(deal, hints = hints)
     game.setup()
     game.loop()
 
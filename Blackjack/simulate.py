@@ -0,0 +1,214 @@
+'''
+Headless blackjack simulator
+    plays millions of hands with a hit/stand strategy table and reports the expected value,
+    bust rate and win/loss/push split for each starting hand
+
+Hands are played in NumPy batches: every row of an array is its own pre-shuffled multi-deck
+shoe, and each round is dealt to every shoe at once until the cut card is reached.
+
+The dealer hits on 16 or less, the same as the game, and a two card 21 pays --blackjack-pays.
+
+Usage: python3 simulate.py --hands 1000000 --decks 6 --strategy basic
+'''
+import argparse, sys, time
+
+import numpy as np
+
+# card values in one deck, aces count as 1 here and as 11 when that does not bust the hand
+DECK = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10] * 4, dtype = np.int8)
+
+# column of the strategy table for each dealer up card value (2-10 then ace)
+UP_CARDS = '23456789TA'
+
+'''
+Strategy table for hitting or standing
+    table[soft][total][dealer up card] is True to hit, totals above 21 are never looked up
+'''
+def empty_table():
+    return np.zeros((2, 22, 11), dtype = bool)
+
+def basic_strategy():
+    table = empty_table()
+    up = np.arange(11)
+    # hard totals - always hit 11 or less, hit 12 against 2, 3 and 7 to ace, hit 13-16 against 7 to ace
+    table[0, :12] = True
+    table[0, 12] = (up <= 3) | (up >= 7) | (up == 1)
+    table[0, 13:17] = (up >= 7) | (up == 1)
+    # soft totals - hit 17 or less, hit 18 against 9, 10 and ace
+    table[1, :18] = True
+    table[1, 18] = (up >= 9) | (up == 1)
+    return table
+
+'''
+Loads a strategy chart from a text file, one line per total with an H or S for each dealer up card 2-A
+    hard 12 HHSSSHHHHH
+    soft 18 SSSSSSSHHH
+totals which are not listed stand
+'''
+def load_table(path):
+    table = empty_table()
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            kind, total, actions = parts[0].lower(), int(parts[1]), parts[2].upper()
+            if kind not in ('hard', 'soft') or len(actions) != len(UP_CARDS):
+                raise ValueError(f'Invalid strategy line: {line.strip()}')
+            for card, action in zip(UP_CARDS, actions):
+                up = 1 if card == 'A' else (10 if card == 'T' else int(card))
+                table[kind == 'soft', total, up] = action == 'H'
+    return table
+
+'''
+Hand values for arrays of hard totals and whether each hand holds an ace
+    returns the best value of each hand and whether it is soft (an ace counting as 11)
+'''
+def hand_values(total, ace):
+    soft = ace & (total + 10 <= 21)
+    return np.where(soft, total + 10, total), soft
+
+'''
+Class for a batch of shoes being played at once
+'''
+class Batch:
+    def __init__(self, rng, shoes, decks, penetration):
+        shoe = np.tile(DECK, decks)
+        self.cut = int(len(shoe) * penetration)
+        # an extra deck past the end of each shoe so a round started before the cut card never runs out
+        self.cards = np.concatenate([rng.permuted(np.tile(shoe, (shoes, 1)), axis = 1),
+                                     rng.permuted(np.tile(DECK, (shoes, 1)), axis = 1)], axis = 1)
+        self.rows = np.arange(shoes)
+        self.position = np.zeros(shoes, dtype = np.int64)
+
+    def active(self):
+        return self.position < self.cut
+
+    def draw(self, mask):
+        # deals the next card of each shoe, only shoes in the mask use up their card
+        cards = self.cards[self.rows, self.position]
+        self.position += mask
+        return np.where(mask, cards, 0)
+
+'''
+Plays a round in every active shoe of the batch
+    returns the mask of shoes which played, each hand's starting value, whether it started soft,
+    the payout and whether the player bust
+'''
+def play_round(batch, table, blackjack_pays, hit_soft_17):
+    active = batch.active()
+    player = batch.draw(active).astype(np.int16)
+    dealer_up = batch.draw(active).astype(np.int16)
+    card = batch.draw(active)
+    player_ace = (player == 1) | (card == 1)
+    player += card
+    dealer_hole = batch.draw(active)
+    dealer = dealer_up + dealer_hole
+    dealer_ace = (dealer_up == 1) | (dealer_hole == 1)
+
+    start_value, start_soft = hand_values(player, player_ace)
+    player_blackjack = start_value == 21
+    dealer_blackjack = hand_values(dealer, dealer_ace)[0] == 21
+
+    # the player hits until the strategy says stand or they bust
+    acting = active & ~player_blackjack & ~dealer_blackjack
+    while acting.any():
+        value, soft = hand_values(player, player_ace)
+        hit = acting & table[soft.astype(np.int8), np.minimum(value, 21), dealer_up]
+        card = batch.draw(hit)
+        player += card
+        player_ace |= card == 1
+        acting = hit & (player <= 21)
+    player_value = hand_values(player, player_ace)[0]
+    bust = active & (player_value > 21)
+
+    # the dealer only plays out their hand when the player is still in
+    acting = active & ~bust & ~player_blackjack & ~dealer_blackjack
+    while acting.any():
+        value, soft = hand_values(dealer, dealer_ace)
+        hit = acting & ((value <= 16) | (hit_soft_17 & soft & (value == 17)))
+        card = batch.draw(hit)
+        dealer += card
+        dealer_ace |= card == 1
+        acting = hit
+    dealer_value = hand_values(dealer, dealer_ace)[0]
+
+    payout = np.select(
+        [bust, player_blackjack & dealer_blackjack, player_blackjack, dealer_blackjack,
+         dealer_value > 21, player_value > dealer_value, player_value < dealer_value],
+        [-1.0, 0.0, blackjack_pays, -1.0, 1.0, 1.0, -1.0],
+        0.0)
+    return active, start_value, start_soft, payout, bust
+
+'''
+Class for the totals collected for each starting hand
+    starting hands are indexed by soft * 22 + value
+'''
+class Results:
+    def __init__(self):
+        self.hands = np.zeros(44, dtype = np.int64)
+        self.wins = np.zeros(44, dtype = np.int64)
+        self.losses = np.zeros(44, dtype = np.int64)
+        self.pushes = np.zeros(44, dtype = np.int64)
+        self.busts = np.zeros(44, dtype = np.int64)
+        self.payout = np.zeros(44)
+
+    def add(self, active, start_value, start_soft, payout, bust):
+        index = (start_soft.astype(np.int64) * 22 + start_value)[active]
+        payout, bust = payout[active], bust[active]
+        self.hands += np.bincount(index, minlength = 44)
+        self.wins += np.bincount(index, weights = payout > 0, minlength = 44).astype(np.int64)
+        self.losses += np.bincount(index, weights = payout < 0, minlength = 44).astype(np.int64)
+        self.pushes += np.bincount(index, weights = payout == 0, minlength = 44).astype(np.int64)
+        self.busts += np.bincount(index, weights = bust, minlength = 44).astype(np.int64)
+        self.payout += np.bincount(index, weights = payout, minlength = 44)
+
+    def total(self):
+        return int(self.hands.sum())
+
+    def report(self):
+        lines = ['start       hands      EV     win    loss    push    bust']
+        for index in np.nonzero(self.hands)[0]:
+            soft, value = divmod(int(index), 22)
+            hands = self.hands[index]
+            name = f"{'soft' if soft else 'hard'} {value}"
+            lines.append(f'{name:<8}{hands:>10} {self.payout[index] / hands:>+7.3f} {self.wins[index] / hands:>7.1%} '
+                         f'{self.losses[index] / hands:>7.1%} {self.pushes[index] / hands:>7.1%} {self.busts[index] / hands:>7.1%}')
+        hands = max(self.total(), 1)
+        lines.append(f'{"all":<8}{self.total():>10} {self.payout.sum() / hands:>+7.3f} {self.wins.sum() / hands:>7.1%} '
+                     f'{self.losses.sum() / hands:>7.1%} {self.pushes.sum() / hands:>7.1%} {self.busts.sum() / hands:>7.1%}')
+        return '\n'.join(lines)
+
+'''
+Plays at least the given number of hands, returns the Results
+'''
+def simulate(hands, table, decks = 6, penetration = 0.75, shoes = 10000, seed = None, blackjack_pays = 1.5, hit_soft_17 = False):
+    rng = np.random.default_rng(seed)
+    results = Results()
+    while results.total() < hands:
+        batch = Batch(rng, shoes, decks, penetration)
+        while batch.active().any() and results.total() < hands:
+            results.add(*play_round(batch, table, blackjack_pays, hit_soft_17))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Simulate blackjack hands with a hit/stand strategy.')
+    parser.add_argument('--hands', type = int, default = 1000000, help = 'number of hands to play')
+    parser.add_argument('--decks', type = int, default = 6, help = 'decks in each shoe')
+    parser.add_argument('--penetration', type = float, default = 0.75, help = 'how far into the shoe the cut card is')
+    parser.add_argument('--shoes', type = int, default = 10000, help = 'shoes played at once in each batch')
+    parser.add_argument('--strategy', default = 'basic', help = '\'basic\' or a path to a strategy chart')
+    parser.add_argument('--blackjack-pays', type = float, default = 1.5, help = 'payout for a two card 21')
+    parser.add_argument('--hit-soft-17', action = 'store_true', help = 'dealer hits a soft 17')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed for shuffling the shoes')
+    args = parser.parse_args()
+
+    table = basic_strategy() if args.strategy == 'basic' else load_table(args.strategy)
+    start_time = time.perf_counter()
+    results = simulate(args.hands, table, args.decks, args.penetration, args.shoes, args.seed, args.blackjack_pays, args.hit_soft_17)
+    elapsed = time.perf_counter() - start_time
+    print(results.report())
+    print(f'{results.total()} hands in {elapsed:.2f}s ({results.total() / max(elapsed, 1e-9):.0f} hands/s)', file = sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+'''
+Blackjack table
+    up to 7 seats, each a person or a bot, play round after round from one shared shoe
+    every seat bets from a bankroll and can double down, split pairs and take insurance
+    seats keep the same hands and clear them each round rather than starting a new Game
+
+The table is driven a line at a time like the other sessions, so the server can host it.
+
+Usage: python3 table.py --seats You bot bot --bankroll 1000 --decks 6
+'''
+import argparse
+
+from main import MAX_DEAL, MAX_DECKS, Counter, Hand, Shoe, config, value_index
+import screen
+
+MAX_SEATS = 7
+# a seat can keep splitting until it has this many hands
+MAX_HANDS = 4
+
+'''
+Class for a Seat at the table
+    bots play basic strategy and always bet the table minimum
+'''
+class Seat:
+    def __init__(self, name, bankroll, bot = False):
+        self.name = name
+        self.bankroll = bankroll
+        self.bot = bot
+        # every hand the seat could need, the ones in play this round are also in self.hands
+        self.pool = [Hand() for i in range(MAX_HANDS)]
+        self.hands = []
+        self.bets = []
+        self.split = []
+        self.insurance = 0
+        self.net = 0
+        self.stats = {'hands' : 0, 'won' : 0, 'lost' : 0, 'pushed' : 0, 'blackjacks' : 0, 'net' : 0}
+
+    def clear(self):
+        for hand in self.hands:
+            hand.clear()
+        self.hands, self.bets, self.split = [], [], []
+        self.insurance = 0
+        self.net = 0
+
+    def bet(self, amount):
+        self.bankroll -= amount
+        self.net -= amount
+
+    def pay(self, amount):
+        self.bankroll += amount
+        self.net += amount
+
+    # takes the next hand from the pool and places the bet on it
+    def new_hand(self, bet, split = False):
+        hand = self.pool[len(self.hands)]
+        self.hands.append(hand)
+        self.bets.append(bet)
+        self.split.append(split)
+        self.bet(bet)
+        return hand
+
+    # a two card 21, a hand made by splitting never counts as a blackjack
+    def is_blackjack(self, index):
+        hand = self.hands[index]
+        return not self.split[index] and hand.size() == 2 and hand.hand_value() == 21
+
+    def can_double(self, index):
+        return self.hands[index].size() == 2 and self.bankroll >= self.bets[index]
+
+    def can_split(self, index):
+        cards = self.hands[index].cards
+        return (len(cards) == 2 and cards[0].get_value() == cards[1].get_value()
+                and len(self.hands) < MAX_HANDS and self.bankroll >= self.bets[index])
+
+'''
+Function choosing a bot's move with basic strategy
+    up is the value of the dealer's up card, with an ace as 11
+'''
+def bot_move(seat, index, up):
+    hand = seat.hands[index]
+    value, soft = hand.hand_value(), hand.is_soft()
+    if seat.can_split(index) and hand.cards[0].get_value() in (-1, 8):
+        return 'split'
+    if seat.can_double(index) and not soft and (value == 11 or (value == 10 and up < 10) or (value == 9 and 3 <= up <= 6)):
+        return 'double'
+    if soft:
+        hit = value <= 17 or (value == 18 and up >= 9)
+    else:
+        hit = value <= 11 or (value == 12 and not 4 <= up <= 6) or (value <= 16 and up >= 7)
+    return 'hit' if hit else 'stand'
+
+'''
+Class for the Table
+    the rounds are played by a generator which stops at every question for a person,
+    each line they send is passed back into it
+'''
+class Table:
+    def __init__(self, seats, terminal = True, decks = 6, penetration = 0.75, deal = None, minimum = 10, maximum = 500, rounds = None, hints = None):
+        self.seats = seats
+        self.terminal = terminal
+        self.shoe = Shoe(decks, penetration, deal)
+        self.shoe.shuffle()
+        self.dealer = Hand()
+        self.minimum = minimum
+        self.maximum = maximum
+        self.rounds = rounds
+        self.round = 0
+        self.dealer_busts = 0
+        self.reveal = False
+        # counting system to give the people at the table hints with, None for no hints
+        self.counter = Counter(hints) if hints else None
+        self.hint = ''
+        self.events = []
+        self.prompt = ''
+        self.finished = False
+        self.turns = self.play()
+
+    def start(self):
+        return self.advance(None)
+
+    def handle(self, line):
+        if line.strip().lower() == 'quit':
+            self.turns.close()
+            self.finished = True
+            return screen.page(self.view() + '\n\n' + self.summary(), self.terminal)
+        return self.advance(line)
+
+    # runs the table until a person has to answer, returns the screen to show
+    def advance(self, line):
+        try:
+            self.prompt = self.turns.send(line)
+        except StopIteration:
+            self.finished = True
+            return screen.page(self.view() + '\n\n' + self.summary(), self.terminal)
+        return screen.page(self.view(), self.terminal)
+
+    # asks until the answer is valid, used with yield from inside the rounds
+    def ask(self, prompt, valid):
+        while True:
+            line = (yield prompt).strip().lower()
+            if valid(line):
+                return line
+            self.events.append(f"'{line}' is not one of the options.")
+
+    def play(self):
+        while self.rounds is None or self.round < self.rounds:
+            playing = [seat for seat in self.seats if seat.bankroll >= self.minimum]
+            if not playing:
+                self.events.append('No one has enough left to bet the table minimum.')
+                return
+            # bots only play on by themselves at a table of bots with a set number of rounds, otherwise rounds
+            # nobody answers would run back to back until every bot was broke
+            if not any(not seat.bot for seat in playing) and (self.rounds is None or any(not seat.bot for seat in self.seats)):
+                self.events.append('No one but the bots has enough left to bet the table minimum.')
+                return
+            yield from self.play_round(playing)
+            if any(not seat.bot for seat in playing):
+                yield from self.ask('- Press Enter for the next round or type \'quit\' to leave: ', lambda line: True)
+
+    def play_round(self, playing):
+        self.round += 1
+        self.events = []
+        self.reveal = False
+        for seat in self.seats:
+            seat.clear()
+        self.dealer.clear()
+        if self.shoe.needs_shuffle():
+            self.shoe.shuffle()
+            if self.counter:
+                self.counter.reset()
+            self.events.append('The cut card has come out, the shoe has been shuffled.')
+
+        for seat in playing:
+            amount = self.minimum
+            if not seat.bot:
+                limit = min(self.maximum, seat.bankroll)
+                answer = yield from self.ask(f'- {seat.name}, how much would you like to bet? ({self.minimum}-{limit}, Enter for {self.minimum}): ',
+                                             lambda line: line == '' or (line.isdigit() and self.minimum <= int(line) <= limit))
+                amount = int(answer or self.minimum)
+            seat.new_hand(amount)
+
+        for i in range(2):
+            for seat in playing:
+                seat.hands[0].add(self.draw())
+            # the dealer's second card is the hole card, which stays face down until the dealer plays
+            self.dealer.add(self.draw(i == 0))
+
+        # insurance is offered when the dealer shows an ace, it costs half the bet and pays 2 to 1
+        if self.dealer.cards[0].get_value() == -1:
+            for seat in playing:
+                cost = seat.bets[0] // 2
+                if seat.bot or not cost or seat.bankroll < cost:
+                    continue
+                answer = yield from self.ask(f'- {seat.name}, would you like insurance for {cost}? (\'yes\' or \'no\'): ',
+                                             lambda line: line in ('yes', 'no', 'y', 'n'))
+                if answer.startswith('y'):
+                    seat.insurance = cost
+                    seat.bet(cost)
+
+        if self.dealer.hand_value() == 21:
+            self.events.append('The dealer has a blackjack.')
+            for seat in playing:
+                if seat.insurance:
+                    seat.pay(seat.insurance * 3)
+        else:
+            for seat in playing:
+                index = 0
+                # splitting adds hands to the end of the list while the seat plays
+                while index < len(seat.hands):
+                    yield from self.play_hand(seat, index)
+                    index += 1
+            # the dealer only draws if a hand is still waiting on them
+            if any(hand.hand_value() <= 21 and not seat.is_blackjack(index) for seat in playing for index, hand in enumerate(seat.hands)):
+                while self.dealer.hand_value() <= 16:
+                    self.dealer.add(self.draw())
+        self.reveal = True
+        if self.counter:
+            self.counter.see(self.dealer.cards[1])
+        self.settle(playing)
+
+    def play_hand(self, seat, index):
+        hand = seat.hands[index]
+        up = self.dealer.cards[0].get_value()
+        up = 11 if up == -1 else up
+        # split aces only get one card each
+        if seat.split[index] and hand.cards[0].get_value() == -1:
+            return
+        if seat.is_blackjack(index):
+            return
+        while hand.hand_value() < 21:
+            options = ['hit', 'stand'] + (['double'] if seat.can_double(index) else []) + (['split'] if seat.can_split(index) else [])
+            if seat.bot:
+                move = bot_move(seat, index, up)
+            else:
+                name = seat.name if len(seat.hands) == 1 else f'{seat.name} (hand {index + 1})'
+                if self.counter:
+                    self.hint = self.hint_for(hand, 'double' in options)
+                move = yield from self.ask(f"- {name}, you have {hand.hand_value()}. What would you like to do? ({', '.join(options)}): ",
+                                           lambda line: line in options)
+                self.hint = ''
+            if move == 'stand':
+                break
+            elif move == 'hit':
+                hand.add(self.draw())
+            elif move == 'double':
+                seat.bet(seat.bets[index])
+                seat.bets[index] *= 2
+                hand.add(self.draw())
+                break
+            elif move == 'split':
+                card = hand.cards[1]
+                hand.remove(card)
+                seat.split[index] = True
+                seat.new_hand(seat.bets[index], True).add(card)
+                hand.add(self.draw())
+                seat.hands[-1].add(self.draw())
+                if card.get_value() == -1:
+                    break
+
+    # deals a card from the shoe, counting it when it is dealt face up
+    def draw(self, visible = True):
+        card = self.shoe.draw()
+        if self.counter and visible:
+            self.counter.see(card)
+        return card
+
+    # the hole card has not been seen so it is counted with the cards left in the shoe
+    def hint_for(self, hand, can_double):
+        counts = list(self.shoe.counts)
+        counts[value_index(self.dealer.cards[1])] += 1
+        up = value_index(self.dealer.cards[0]) + 1
+        return self.counter.hint(hand, up, counts, self.shoe.size() + 1, can_double)
+
+    # pays out every hand, a blackjack pays 3 to 2 rounded down
+    def settle(self, playing):
+        dealer = self.dealer.hand_value()
+        dealer_blackjack = self.dealer.size() == 2 and dealer == 21
+        if dealer > 21:
+            self.dealer_busts += 1
+        for seat in playing:
+            for index, hand in enumerate(seat.hands):
+                bet, value, blackjack = seat.bets[index], hand.hand_value(), seat.is_blackjack(index)
+                if blackjack and not dealer_blackjack:
+                    seat.pay(bet + bet * 3 // 2)
+                    seat.stats['blackjacks'] += 1
+                    result = 'won'
+                elif value > 21 or (dealer_blackjack and not blackjack):
+                    result = 'lost'
+                elif dealer > 21 or value > dealer:
+                    seat.pay(bet * 2)
+                    result = 'won'
+                elif value == dealer:
+                    seat.pay(bet)
+                    result = 'pushed'
+                else:
+                    result = 'lost'
+                seat.stats['hands'] += 1
+                seat.stats[result] += 1
+            seat.stats['net'] += seat.net
+        self.events.append(f'Round {self.round}: ' + ', '.join(f'{seat.name} {seat.net:+}' for seat in playing))
+
+    def view(self):
+        if not self.dealer.cards:
+            dealer = ''
+        elif self.reveal:
+            dealer = f'{self.dealer} ({self.dealer.hand_value()})'
+        else:
+            dealer = f'{self.dealer.cards[0]}, x1 card'
+        lines = [f"{' '.join(config['suits'].values())} Blackjack table - round {self.round}",
+                 f'Cards in shoe: x{self.shoe.size()}',
+                 f'Dealers hand: {dealer}',
+                 '']
+        for seat in self.seats:
+            lines.append(f'{seat.name} - bankroll {seat.bankroll}' + (f', insurance {seat.insurance}' if seat.insurance else ''))
+            for index, hand in enumerate(seat.hands):
+                lines.append(f'    bet {seat.bets[index]}: {hand} ({hand.hand_value()})')
+        return '\n'.join(lines + [''] + self.events + ([self.hint] if self.hint else []))
+
+    # statistics for every seat over all the rounds played
+    def summary(self):
+        lines = [f'{self.round} rounds played, the dealer bust in {self.dealer_busts}.',
+                 f"{'Seat':<12}{'hands':>7}{'won':>7}{'lost':>7}{'pushed':>8}{'blackjacks':>12}{'net':>8}{'bankroll':>10}"]
+        for seat in self.seats:
+            stats = seat.stats
+            lines.append(f"{seat.name:<12}{stats['hands']:>7}{stats['won']:>7}{stats['lost']:>7}{stats['pushed']:>8}"
+                         f"{stats['blackjacks']:>12}{stats['net']:>+8}{seat.bankroll:>10}")
+        return '\n'.join(lines)
+
+'''
+Class for a table with one person and two bots, so the server can host it
+'''
+class Session(Table):
+    def __init__(self, terminal = True):
+        super().__init__([Seat('You', 1000), Seat('Bot 1', 1000, True), Seat('Bot 2', 1000, True)], terminal)
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Play blackjack at a table of up to 7 seats.')
+    parser.add_argument('--seats', nargs = '+', default = ['You', 'bot', 'bot'], help = 'a name for each person at the table, or \'bot\' for a bot')
+    parser.add_argument('--bankroll', type = int, default = 1000, help = 'what every seat starts with')
+    parser.add_argument('--decks', type = int, default = 6, help = 'decks in the shoe')
+    parser.add_argument('--penetration', type = float, default = 0.75, help = 'how far into the shoe the cut card is')
+    parser.add_argument('--minimum', type = int, default = 10, help = 'smallest bet allowed')
+    parser.add_argument('--maximum', type = int, default = 500, help = 'largest bet allowed')
+    parser.add_argument('--rounds', type = int, default = None, help = 'rounds to play, a table of only bots plays 1000 by default')
+    parser.add_argument('--deal', type = lambda text: int(text, 0), default = None, help = 'number the shoe is shuffled with')
+    parser.add_argument('--hints', choices = config['counting'], default = None, help = 'show the count and the value of each move with this counting system')
+    args = parser.parse_args()
+    if len(args.seats) > MAX_SEATS:
+        parser.error(f'a table has at most {MAX_SEATS} seats')
+    if not 1 <= args.decks <= MAX_DECKS:
+        parser.error(f'the shoe holds 1 to {MAX_DECKS} decks')
+    if args.deal is not None and not 0 <= args.deal < MAX_DEAL:
+        parser.error(f'a deal number is from 0 to {MAX_DEAL - 1}')
+
+    seats, bots = [], 0
+    for name in args.seats:
+        if name.lower() == 'bot':
+            bots += 1
+            seats.append(Seat(f'Bot {bots}', args.bankroll, True))
+        else:
+            seats.append(Seat(name, args.bankroll))
+    rounds = args.rounds
+    if rounds is None and bots == len(seats):
+        rounds = 1000
+
+    table = Table(seats, screen.is_terminal(), args.decks, args.penetration, args.deal, args.minimum, args.maximum, rounds, args.hints)
+    output = table.start()
+    while not table.finished:
+        print(output, end = '')
+        output = table.handle(input(table.prompt))
+    print(output, end = '')
+
+if __name__ == '__main__':
+    main()
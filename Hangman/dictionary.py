@@ -0,0 +1,202 @@
+# word list for choosing the secret word in solo games
+# 1. the word list is parsed once and saved to a binary cache next to it, later runs map the cache into memory
+#    instead of reading the text again, and every process which maps it shares the same pages
+# 2. every word gets a difficulty from how many different letters it has, how rare those letters are and how
+#    many other words share its pattern (the word with one letter blanked out, like _ight), the words a guesser
+#    gets stuck on
+# 3. the words are also kept in order of difficulty, so choosing an easy, medium or hard word is picking from a slice
+# 4. the computer guesser's index is saved too, the bitsets of every word length (see solver.py), so it is only
+#    built the first time rather than every time the guesser starts
+#
+# the cache, all little endian:
+#   header   magic, version, word count, then the size and modified time of the word list it was made from
+#   offsets  (count + 1) uint32, where each word starts in the text
+#   scores   count float32, the difficulty of each word
+#   order    count uint32, the words from easiest to hardest
+#   text     every word one after another in ascii, padded with zeros to a multiple of 4 bytes
+#   index    uint32 number of word lengths, then for each length: uint32 length, uint32 word count, word count
+#            uint32 indexes of its words, then a bitset for every (position, letter) and one for every letter
+#            saying which words contain it, a to z, each a whole number of uint32
+
+import math, mmap, os, random, string, struct, sys
+from array import array
+
+# default word list, one word a line, kept next to this file
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'words.txt')
+
+MAGIC = b'HANGWORD'
+VERSION = 2
+# padded to 32 bytes so the arrays after it are aligned
+HEADER = struct.Struct('<8sHIqq2x')
+
+LEVELS = ('easy', 'medium', 'hard')
+
+# words already opened in this process, by the path of the word list
+stores = {}
+
+# reads a word list, keeping only words made of the letters a-z, sorted with no repeats
+def read_words(path):
+    with open(path, encoding = 'utf-8', errors = 'ignore') as f:
+        words = set(line.strip().lower() for line in f)
+    return sorted(word for word in words if word and all(letter in string.ascii_lowercase for letter in word))
+
+# the difficulty of every word, higher is harder
+def difficulties(words):
+    # how rare each letter is, from how many of the words have it
+    having = {letter: 0 for letter in string.ascii_lowercase}
+    for word in words:
+        for letter in set(word):
+            having[letter] += 1
+    rarity = {letter: math.log2(len(words) / count) if count else 0.0 for letter, count in having.items()}
+    # how many words share each pattern of a word with one letter blanked out
+    patterns = {}
+    for word in words:
+        for i in range(len(word)):
+            pattern = word[:i] + '_' + word[i + 1:]
+            patterns[pattern] = patterns.get(pattern, 0) + 1
+    scores = []
+    for word in words:
+        letters = set(word)
+        neighbours = sum(patterns[word[:i] + '_' + word[i + 1:]] - 1 for i in range(len(word)))
+        scores.append(sum(rarity[letter] for letter in letters) / len(letters) + math.log2(1 + neighbours) + 6 / len(letters))
+    return scores
+
+def little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+# the bitsets of words which are all the same length: for every position a bitset for each letter, bit i set when
+# word i has that letter there, and for every letter a bitset of the words which contain it
+def letter_bitsets(words):
+    positions = [{letter: 0 for letter in string.ascii_lowercase} for i in range(len(words[0]))]
+    contains = {letter: 0 for letter in string.ascii_lowercase}
+    for i, word in enumerate(words):
+        bit = 1 << i
+        for position, letter in enumerate(word):
+            positions[position][letter] |= bit
+            contains[letter] |= bit
+    return positions, contains
+
+# the bytes of the index section, the words split by length with the bitsets of each length
+def build_index(words):
+    buckets = {}
+    for i, word in enumerate(words):
+        buckets.setdefault(len(word), []).append(i)
+    parts = [struct.pack('<I', len(buckets))]
+    for length, ids in sorted(buckets.items()):
+        positions, contains = letter_bitsets([words[i] for i in ids])
+        stride = (len(ids) + 31) // 32 * 4
+        parts += [struct.pack('<II', length, len(ids)), little_endian(array('I', ids))]
+        parts += [bits[letter].to_bytes(stride, 'little') for bits in positions + [contains] for letter in string.ascii_lowercase]
+    return b''.join(parts)
+
+# an array in the cache, used where it is on little endian machines and copied and swapped on big endian ones
+def section(view, code):
+    if sys.byteorder == 'little':
+        return view.cast(code)
+    values = array(code, bytes(view))
+    values.byteswap()
+    return values
+
+# the bytes of the cache for a word list
+def build(path):
+    words = read_words(path)
+    scores = difficulties(words)
+    order = sorted(range(len(words)), key = lambda i: scores[i])
+    offsets = array('I', [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+    status = os.stat(path)
+    text = ''.join(words).encode('ascii')
+    return b''.join([HEADER.pack(MAGIC, VERSION, len(words), status.st_size, status.st_mtime_ns),
+                     little_endian(offsets), little_endian(array('f', scores)), little_endian(array('I', order)),
+                     text, bytes(-len(text) % 4), build_index(words)])
+
+# the words from the cache, read straight out of the mapped file
+class Store:
+    def __init__(self, data):
+        self.data = data
+        magic, version, self.count, self.size, self.mtime = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a word cache')
+        view = memoryview(data)
+        start = HEADER.size
+        sections = []
+        for code, length in (('I', self.count + 1), ('f', self.count), ('I', self.count)):
+            end = start + length * 4
+            sections.append(section(view[start:end], code))
+            start = end
+        self.offsets, self.scores, self.order = sections
+        self.text = view[start:start + self.offsets[self.count]]
+        self.index_start = start + (self.offsets[self.count] + 3) // 4 * 4
+
+    def __len__(self):
+        return self.count
+
+    def word(self, i):
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode('ascii')
+
+    def words(self):
+        text = bytes(self.text).decode('ascii')
+        return [text[self.offsets[i]:self.offsets[i + 1]] for i in range(self.count)]
+
+    # the words of each length with their bitsets, as {length: (words, positions, contains)} like letter_bitsets
+    def buckets(self):
+        words = self.words()
+        view = memoryview(self.data)
+        start = self.index_start
+        (lengths,) = struct.unpack_from('<I', self.data, start)
+        start += 4
+        buckets = {}
+        for i in range(lengths):
+            length, count = struct.unpack_from('<II', self.data, start)
+            start += 8
+            ids = section(view[start:start + count * 4], 'I')
+            start += count * 4
+            stride = (count + 31) // 32 * 4
+            bitsets = []
+            for j in range(length + 1):
+                bitsets.append({letter: int.from_bytes(view[start + k * stride:start + (k + 1) * stride], 'little')
+                                for k, letter in enumerate(string.ascii_lowercase)})
+                start += 26 * stride
+            buckets[length] = ([words[i] for i in ids], bitsets[:-1], bitsets[-1])
+        return buckets
+
+    # a random word, from a third of the words by difficulty when a level is given
+    def choose(self, level = None, rng = random):
+        if level is None:
+            return self.word(rng.randrange(self.count))
+        third = LEVELS.index(level)
+        start, end = self.count * third // 3, self.count * (third + 1) // 3
+        return self.word(self.order[rng.randrange(start, max(end, start + 1))])
+
+# maps the cache for a word list, making it first if it is missing or older than the list
+def open_store(path = WORDS_PATH):
+    path = os.path.abspath(path)
+    if path in stores:
+        return stores[path]
+    status = os.stat(path)
+    cache = path + '.cache'
+    store = None
+    try:
+        with open(cache, 'rb') as f:
+            store = Store(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+        if (store.size, store.mtime) != (status.st_size, status.st_mtime_ns):
+            store = None
+    except (OSError, ValueError, struct.error):
+        store = None
+    if store is None:
+        data = build(path)
+        try:
+            # written to a temporary file first so another process never maps half a cache
+            with open(cache + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(cache + '.tmp', cache)
+            with open(cache, 'rb') as f:
+                store = Store(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+        except OSError:
+            # somewhere the cache cannot be written, the words are kept in memory instead
+            store = Store(data)
+    stores[path] = store
+    return store
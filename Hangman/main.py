@@ -1,12 +1,10 @@
-import os
+import argparse, os, sys
 
-print('Welcome to Python Hangman 1.0!')
+# the screen module is shared by all the games and lives in the folder above
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import screen, profiling
+import dictionary, solver
 
-word = input('Please enter the word that others will guess: ').lower()
-
-words = list(word)
-blank_word = "_ " * len(words)
-blank_word = blank_word.split()
 hanging = {0 : "|----|\n|\n|\n|\n|\n{}",
            1 : "|----|\n|    o\n|\n|\n|\n{}",
            2 : "|----|\n|    o\n|    |\n|\n|\n{}",
@@ -15,40 +13,129 @@ hanging = {0 : "|----|\n|\n|\n|\n|\n{}",
            5 : "|----|\n|    o\n|   /|\\\n|   /\n|\n{}",
            6 : "|----|\n|    o\n|   /|\\\n|   / \\\n|\n{}"}
 
-letters, playing, turns, hang_counter = [], True, 0, 0
-clear = lambda: os.system('clear')
-
-clear()
-
-while playing:
-    letter = input("Letter: ").lower()
-
-    if letter in letters:
-        clear()
-        print('Already used {}.'.format(letter))
-    elif len(letter) > 1:
-        clear()
-        print('Please, just one character..')
-    elif letter in words:
-        turns += 1
-        for i, l in enumerate(words):
-            if l == letter:
-                blank_word[word.index(letter, i)] = letter
-                words.remove(letter)
-        letters.append(letter)
-        clear()
+# one game played a line at a time, so it can be driven by the terminal or by the server
+# the first line is the word to guess and every line after is a guess
+# with an index from solver.py the computer does the guessing, one letter every line
+class Session:
+    def __init__(self, terminal = True, index = None):
+        self.terminal = terminal
+        self.index = index
+        self.word = None
+        self.prompt = 'Please enter the word that others will guess: '
+        self.finished = False
+
+    def start(self):
+        return 'Welcome to Python Hangman 1.0!\n'
+
+    def handle(self, line):
+        with profiling.section('hangman.command'):
+            if self.word is None:
+                self.setup(line.lower())
+                return screen.page('', self.terminal)
+            if self.index:
+                with profiling.section('hangman.solver'):
+                    letter = self.index.best_letter(self.blank_word, self.letters)
+                return self.guess(letter, 'The computer guessed {}.\n'.format(letter))
+            return self.guess(line.lower())
+
+    def setup(self, word):
+        self.word = word
+        self.words = list(word)
+        self.blank_word = ("_ " * len(self.words)).split()
+        self.letters, self.turns, self.hang_counter = [], 0, 0
+        self.prompt = 'Press Enter for the computer\'s next guess: ' if self.index else 'Letter: '
+
+    def board(self, notice = ''):
+        return notice + hanging[self.hang_counter].format(" ".join(self.blank_word)) + "\nLetters used: %s" % ", ".join(map(str, self.letters))
+
+    # applies a guess without drawing anything, returns the events and anything to tell the player
+    def play(self, letter):
+        if letter in self.letters:
+            events, notice = [('repeat', letter)], 'Already used {}.\n'.format(letter)
+        elif len(letter) > 1:
+            events, notice = [('invalid', letter)], 'Please, just one character..\n'
+        elif letter in self.words:
+            self.turns += 1
+            # every place the letter appears is shown, the computer relies on that to narrow down the word
+            for i, l in enumerate(self.word):
+                if l == letter:
+                    self.blank_word[i] = letter
+            self.words = [l for l in self.words if l != letter]
+            self.letters.append(letter)
+            events, notice = [('hit', letter)], ''
+        else:
+            self.letters.append(letter)
+            self.turns += 1
+            self.hang_counter += 1
+            events, notice = [('miss', letter)], ''
+
+        if len(self.words) == 0:
+            self.finished = True
+            events.append(('won', self.turns))
+        elif self.hang_counter == 6:
+            self.finished = True
+            events.append(('lost', self.word))
+        return events, notice
+
+    def guess(self, letter, notice = ''):
+        # anything to tell the player is shown above the hangman once the screen is cleared
+        events, message = self.play(letter)
+        output = self.board(notice + message)
+
+        if events[-1][0] == 'won':
+            output += "\nWord has been guessed in {} turns.".format(self.turns)
+        elif events[-1][0] == 'lost':
+            output += "\nGame over.. The word was {}. Better luck next time!".format(self.word)
+        return screen.page(output, self.terminal)
+
+# a game on your own, the word is chosen from the word list at the difficulty asked for
+class Solo(Session):
+    def __init__(self, terminal = True, difficulty = None, path = dictionary.WORDS_PATH):
+        super().__init__(terminal)
+        self.difficulty = difficulty
+        self.path = path
+
+    def start(self):
+        try:
+            store = dictionary.open_store(self.path)
+        except OSError:
+            self.finished = True
+            return 'There is no word list to choose a word from, see the README.\n'
+        self.setup(store.choose(self.difficulty))
+        return screen.page('Welcome to Python Hangman 1.0!\n' + self.board(), self.terminal)
+
+# headless game for bots, tests and replaying recorded commands
+# new_game gives the state and events of a new game for the word, step plays one guess on it
+# each event is a tuple starting with its name, nothing is drawn
+def new_game(word):
+    session = Session(False)
+    session.setup(word.lower())
+    return session, []
+
+def step(session, command):
+    if session.finished:
+        return session, []
+    return session, session.play(command.lower())[0]
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Play hangman.')
+    parser.add_argument('--computer', action = 'store_true', help = 'let the computer guess the word you enter')
+    parser.add_argument('--solo', action = 'store_true', help = 'guess a word chosen from the word list')
+    parser.add_argument('--difficulty', choices = dictionary.LEVELS, default = None, help = 'how hard a word to choose in a solo game')
+    parser.add_argument('--words', default = dictionary.WORDS_PATH, help = 'word list to guess from or choose the word from, one word a line')
+    parser.add_argument('--profile', nargs = '?', const = profiling.DEFAULT_PATH, metavar = 'FILE', help = 'time every guess and save a profile to the file on exit')
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+    if (args.computer or args.solo) and not os.path.exists(args.words):
+        parser.error('no word list at {}, download one (e.g. /usr/share/dict/words) or pass --words'.format(args.words))
+    if args.solo:
+        session = Solo(screen.is_terminal(), args.difficulty, args.words)
     else:
-        letters.append(letter)
-        turns += 1
-        hang_counter += 1
-        clear()
-
-    print(hanging[hang_counter].format(" ".join(blank_word)))
-    print("Letters used: %s" % ", ".join(map(str, letters)))
-
-    if len(words) == 0:
-        print("Word has been guessed in {} turns.".format(turns))
-        playing = False
-    elif hang_counter == 6:
-        print("Game over.. The word was {}. Better luck next time!".format(word))
-        playing = False
+        session = Session(screen.is_terminal(), solver.load(args.words) if args.computer else None)
+    sys.stdout.write(session.start())
+    while not session.finished:
+        sys.stdout.write(session.handle(input(session.prompt)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# computer guesser for hangman
+# 1. the word list is split into buckets by length, only words as long as the secret word can be it
+# 2. each bucket keeps a bitset for every (position, letter) - bit i is set when word i has that letter there -
+#    and one for every letter saying which words contain it at all
+# 3. the words still possible are found by and-ing those bitsets together from the letters shown and the misses,
+#    so no word is ever looked at one by one after the index is built
+# 4. the letter guessed is the one whose answer (where it appears, or that it is not there) tells the most
+#    about the word, its information gain over the words still possible
+
+import math
+
+from dictionary import WORDS_PATH, letter_bitsets, open_store
+
+# most best letters remembered before the cache is emptied
+CACHE_SIZE = 100000
+
+# letters by how often they appear in english, used when no word in the list fits
+FREQUENCY = 'etaoinshrdlucmfwypvbgkjqxz'
+
+# int.bit_count is only in python 3.10 and later
+def popcount(bits):
+    return bin(bits).count('1')
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+
+# the words of one length and their bitsets, which are built from the words when they are not given
+class Bucket:
+    def __init__(self, words, positions = None, contains = None):
+        self.words = words
+        self.all = (1 << len(words)) - 1
+        if positions is None:
+            positions, contains = letter_bitsets(words)
+        self.positions = positions
+        self.contains = contains
+
+    # bitset of the words which fit the pattern ('_' for a letter not shown yet) and none of the missed letters
+    def candidates(self, pattern, missed):
+        bits = self.all
+        shown = set(letter for letter in pattern if letter != '_')
+        for position, letter in enumerate(pattern):
+            if letter != '_':
+                bits &= self.positions[position][letter]
+            else:
+                # a letter which has been guessed is shown everywhere it appears, so it is not in any blank
+                for guessed in shown:
+                    bits &= ~self.positions[position][guessed]
+        for letter in missed:
+            bits &= ~self.contains[letter]
+        return bits
+
+    # information gain of guessing the letter, from how it splits the candidates by where it would appear
+    def gain(self, bits, letter, blanks):
+        total = popcount(bits)
+        parts = [bits & self.contains[letter]]
+        missed = bits & ~parts[0]
+        if not parts[0]:
+            return 0.0
+        for position in blanks:
+            split = []
+            for part in parts:
+                inside = part & self.positions[position][letter]
+                for piece in (inside, part & ~inside):
+                    if piece:
+                        split.append(piece)
+            parts = split
+        gain = 0.0
+        for part in parts + ([missed] if missed else []):
+            chance = popcount(part) / total
+            gain -= chance * math.log2(chance)
+        return gain
+
+    def words_in(self, bits):
+        words = []
+        while bits:
+            low = bits & -bits
+            words.append(self.words[low.bit_length() - 1])
+            bits ^= low
+        return words
+
+# the word list split into buckets by length
+class Index:
+    def __init__(self, words = (), buckets = None):
+        if buckets is None:
+            buckets = {}
+            for word in sorted(set(words)):
+                buckets.setdefault(len(word), []).append(word)
+            buckets = {length: (words, None, None) for length, words in buckets.items()}
+        self.buckets = {length: Bucket(*bucket) for length, bucket in buckets.items()}
+        # best letters already worked out, the opening guesses for each length come up again and again
+        self.cache = {}
+
+    # bitset of the possible words and the bucket they are in, None when no word is the right length
+    def candidates(self, pattern, guessed):
+        bucket = self.buckets.get(len(pattern))
+        if bucket is None:
+            return None, 0
+        missed = [letter for letter in guessed if letter not in pattern]
+        return bucket, bucket.candidates(pattern, missed)
+
+    def possible(self, pattern, guessed):
+        bucket, bits = self.candidates(pattern, guessed)
+        return bucket.words_in(bits) if bucket else []
+
+    # the best letter to guess next, pattern is the word as shown so far and guessed every letter tried
+    def best_letter(self, pattern, guessed):
+        key = (''.join(pattern), ''.join(sorted(guessed)))
+        if key not in self.cache:
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = self.choose(pattern, guessed)
+        return self.cache[key]
+
+    def choose(self, pattern, guessed):
+        bucket, bits = self.candidates(pattern, guessed)
+        letters = [letter for letter in FREQUENCY if letter not in guessed]
+        if not bits:
+            return letters[0] if letters else None
+        blanks = [position for position, letter in enumerate(pattern) if letter == '_']
+        # ties, like when only one word is left, go to the letter in the most of the possible words
+        best, best_score = None, None
+        for letter in letters:
+            score = (bucket.gain(bits, letter, blanks), popcount(bits & bucket.contains[letter]))
+            if best_score is None or score > best_score:
+                best, best_score = letter, score
+        return best
+
+# index of a word list, the words and bitsets come from its cache so they are only worked out the first time
+def load(path = WORDS_PATH):
+    return Index(buckets = open_store(path).buckets())
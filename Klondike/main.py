@@ -2,7 +2,12 @@
 from colorama import init
 init()
 
-import os, sys, random, datetime
+import io, os, sys, random, datetime, struct, zlib
+
+# the screen module is shared by all the games and lives in the folder above
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from screen import Renderer
+import screen, profiling
 
 class Suit:
     """ Class representing each suit in the deck of cards.
@@ -78,13 +83,25 @@ class Move:
         destination: the end location for the move (waste, tableau, foundation)
         card_shown: if a card was unvieled during the move
         deck_recylced: if the deck was recylced
+        source: index of the pile in Board.piles the cards are moved from
+        target: index of the pile in Board.piles the cards are moved to
+        count: the number of cards being moved, for draws the number of cards drawn
+        draw_shown: if the card drawn from the deck was turned face up for the first time
+        points: the change in score the move caused
+        encoded: the bytes the move is saved as, None until the move is first saved
     """
 
-    def __init__(self, initial, destination, card_shown = False):
+    def __init__(self, initial, destination, card_shown = False, source = None, target = None, count = 1):
         self.initial = initial
         self.destination = destination
         self.card_shown = card_shown
         self.deck_recylced = False
+        self.source = source
+        self.target = target
+        self.count = count
+        self.draw_shown = False
+        self.points = 0
+        self.encoded = None
 
     def __str__(self):
         return f'{self.initial} -> {self.destination}'
@@ -158,6 +175,46 @@ class CardCollection:
         return len(self.cards)
 
 
+# deal numbers are 64 bit, from 0 up to but not including MAX_DEAL
+MAX_DEAL = 2 ** 64
+
+
+def parse_deal(text):
+    """ Function reading a deal number typed by the player, in decimal or with a 0x, 0o or 0b prefix
+
+    Raises:
+        ValueError: if the text is not a number or the number is not a 64 bit deal number
+    """
+
+    try:
+        deal = int(text, 0)
+    except ValueError:
+        raise ValueError(f'{text!r} is not a deal number') from None
+    check_deal(deal)
+    return deal
+
+
+def check_deal(deal):
+    # raises ValueError for a deal number which is not 64 bit, None is left for a random deal
+    if deal is not None and not 0 <= deal < MAX_DEAL:
+        raise ValueError(f'a deal number is from 0 to {MAX_DEAL - 1}')
+
+
+def deal_order(deal):
+    """ Function to find the order of the cards for a deal without building the deck
+
+    Arguments:
+        deal: the 64 bit deal number
+
+    Returns:
+        a list of card numbers (suit position * 13 + rank) in the same order as Deck(deal).cards
+    """
+
+    order = list(range(52))
+    random.Random(deal).shuffle(order)
+    return order
+
+
 class Deck(CardCollection):
     """ Class representing the game deck.
 
@@ -167,6 +224,8 @@ class Deck(CardCollection):
         suits (class): dictionary containing all the suits and details about them
         faces (class): dictionary containing the various face cards
         cards (inherited): a standard list containing all the cards in the collection
+        deal: the 64 bit number the deck was shuffled with, the same number always gives the same deal
+        random: the random number generator used to shuffle this deck
     """
 
     suits = {
@@ -182,8 +241,12 @@ class Deck(CardCollection):
         'K' : 'king',
     }
 
-    def __init__(self):
+    def __init__(self, deal = None):
         super().__init__()
+        # pick a random deal number when one is not given so every deal can be played again
+        check_deal(deal)
+        self.deal = random.getrandbits(64) if deal is None else deal
+        self.random = random.Random(self.deal)
         for suit in self.suits.values():
             card_values = ['A'] + list(range(2,11)) + list(self.faces)
             for i in range(len(card_values)):
@@ -196,6 +259,9 @@ class Deck(CardCollection):
         else:
             return '(E)'
 
+    def shuffle(self):
+        self.random.shuffle(self.cards)
+
     def draw(self):
         if self.size() > 0:
             return self.cards.pop()
@@ -232,6 +298,24 @@ class Foundation(CardCollection):
         return self.suit
 
 
+# random 64 bit numbers for every card at every position of every pile, and for every card being shown, used for zobrist hashing the board
+zobrist_random = random.Random(0)
+zobrist_keys = [[[zobrist_random.getrandbits(64) for card in range(52)] for position in range(52)] for pile in range(13)]
+zobrist_shown = [zobrist_random.getrandbits(64) for card in range(52)]
+
+# position of each suit in the deck, a card's number is the suit position * 13 + rank
+suit_numbers = {name: i for i, name in enumerate(Deck.suits)}
+
+# the colour of each suit in the deck, in order of suit number
+suit_colours = [suit.get_colour() for suit in Deck.suits.values()]
+
+# the card numbers each card can be placed onto in the tableau - one rank higher and the other colour
+stack_targets = [
+    [other * 13 + card % 13 + 1 for other in range(4) if suit_colours[other] != suit_colours[card // 13]] if card % 13 < 12 else []
+    for card in range(52)
+]
+
+
 class Board:
     """ Class representing the game board
 
@@ -240,6 +324,11 @@ class Board:
         waste: card collection of the cards drawn from the deck
         foundations: list to store the 4 suit ace-king piles
         tableau: list to represent the main board of the game - 7 piles of cards
+        piles: list of every pile on the board - deck, waste, foundations then tableau
+        hash: 64 bit zobrist hash of the board, updated as cards are moved
+        changed: set of pile indices which have changed since legal moves were last found
+        summaries: the cards of each pile legal_moves needs, only rebuilt for changed piles
+        renderer: draws the board to the terminal, keeping the last frame so only changes are redrawn
     """
 
     columns = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
@@ -251,7 +340,11 @@ class Board:
     To move cards from foundation pile to the tableau type '*{1-4} [A-G]'. (numbers are left-right)
     To move cards from tableau pile to foundation type '[A-G] *'.
     To move cards from waste pile to foundation type 'W *'.
+    To undo the last move type 'undo' and to play it again type 'redo'.
     To exit the game type 'quit'.
+    To play a deal again start the game with its deal number, e.g. 'python3 main.py 1234'.
+    Once the deck and waste are empty and every card is face up the rest are put on the foundations for you.
+    To have safe cards moved to the foundations after every move start the game with '--auto-foundation'.
     '''
 
     scoring = '''Scoring:
@@ -263,12 +356,18 @@ class Board:
     Recyling Waste : -100 points (0 minimum score)
     '''
 
-    def __init__(self):
-        self.deck = Deck()
+    def __init__(self, deal = None):
+        self.deck = Deck(deal)
         self.waste = CardCollection()
         self.foundations = [Foundation(suit) for suit in Deck.suits.values()]
         self.tableau = [CardCollection() for i in range(7)]
+        # every pile on the board, the position of a pile in this list is used for its zobrist keys
+        self.piles = [self.deck, self.waste] + self.foundations + self.tableau
         self.message = 'Type \'help\' for a list of commands and to see how scoring works.'
+        self.hash = self.compute_hash()
+        self.changed = set(range(len(self.piles)))
+        self.summaries = [None] * len(self.piles)
+        self.renderer = Renderer()
 
     def setup(self):
         # adds cards to the tableau increasing by 1 for each pile and setting last card in each pile to shown
@@ -278,19 +377,63 @@ class Board:
                 self.tableau[i].add(card)
                 if i == j:
                     card.set_shown()
+        self.hash = self.compute_hash()
+        self.changed.update(range(len(self.piles)))
+
+    def card_number(card):
+        # gives each card a number 0-51, suit position in the deck * 13 + rank
+        return suit_numbers[card.get_suit().name] * 13 + card.get_rank()
+
+    def card_key(self, collection, position, card):
+        # the zobrist key for a card at a position in one of the piles
+        return zobrist_keys[self.piles.index(collection)][position][Board.card_number(card)]
+
+    def compute_hash(self):
+        # builds the zobrist hash from scratch by combining the key of every card on the board
+        value = 0
+        for collection in self.piles:
+            for position, card in enumerate(collection.get_cards()):
+                value ^= self.card_key(collection, position, card)
+                if card.is_shown():
+                    value ^= zobrist_shown[Board.card_number(card)]
+        return value
+
+    def show_card(self, card):
+        # turns a card face up and updates the hash if it was facing down, returns whether the card was turned
+        if not card.is_shown():
+            card.set_shown()
+            self.hash ^= zobrist_shown[Board.card_number(card)]
+            return True
+        return False
+
+    def hide_card(self, card):
+        # turns a card face down again when a move is undone
+        card.shown = False
+        self.hash ^= zobrist_shown[Board.card_number(card)]
+
+    def recycle(self, collection_a, collection_b):
+        # moves every card from collection a onto collection b in reverse order, turning the pile over
+        self.changed.update((self.piles.index(collection_a), self.piles.index(collection_b)))
+        for card in collection_a.get_cards()[::-1]:
+            self.hash ^= self.card_key(collection_a, collection_a.size() - 1, card)
+            self.hash ^= self.card_key(collection_b, collection_b.size(), card)
+            collection_a.remove(card)
+            collection_b.add(card)
 
     def draw(self, move):
+        # the move counts the cards drawn so it can be undone
+        if not move.deck_recylced:
+            move.count = 0
         # if there are cards in the deck then draw a card and add it to waste pile
         if self.deck.size() > 0:
-            card = self.deck.draw()
-            self.waste.add(card)
-            card.set_shown()
+            card = self.deck.get_card(-1)
+            self.move_cards(self.deck, self.waste, [card])
+            move.draw_shown = self.show_card(card)
+            move.count += 1
         # otherwise recycle the cards in the waste pile
         else:
             move.set_recycled()
-            for card in self.waste.get_cards()[::-1]:
-                self.waste.remove(card)
-                self.deck.add(card)
+            self.recycle(self.waste, self.deck)
         # if the deck has cards and wast does not then call the function again
         if self.waste.size() == 0 and self.deck.size() != 0:
             self.draw(move)
@@ -302,27 +445,36 @@ class Board:
             if foundation.get_suit() == card.get_suit():
                 return foundation
 
-    def foundation_ace(self, collection_a, collection_b, card):
+    def foundation_ace(self, collection_a, collection_b, card, move):
         # if the collection b has no cards then it must be an ace to be moved over
         if collection_b.size() == 0:
             if card.get_rank() != 0:
                 return -1
-            collection_a.remove(card)
-            collection_b.add(card)
-            next_card = collection_a.get_card(-1)
-            if isinstance(next_card, Card):
-                next_card.set_shown()
+            self.set_piles(move, collection_a, collection_b, 1)
+            self.move_cards(collection_a, collection_b, [card])
+            self.last_card_shown(collection_a.get_card(-1), move)
             return 1
 
-    def last_card_shown(card, move):
+    def set_piles(self, move, collection_a, collection_b, count):
+        # records exactly which piles a move used so it can be undone
+        move.source = self.piles.index(collection_a)
+        move.target = self.piles.index(collection_b)
+        move.count = count
+
+    def last_card_shown(self, card, move):
         # if the card is a card then make it set to being shown
         if isinstance(card, Card) and not card.is_shown():
-            card.set_shown()
+            self.show_card(card)
             move.set_shown()
 
-    def move_cards(collection_a, collection_b, cards):
+    def move_cards(self, collection_a, collection_b, cards):
         # loops through the cards to be moved and removes them from collection a and adds to collection b
-        for card in cards:
+        position_a = collection_a.size() - len(cards)
+        position_b = collection_b.size()
+        self.changed.update((self.piles.index(collection_a), self.piles.index(collection_b)))
+        for i, card in enumerate(cards):
+            # swap the card's key for its old position out of the hash and the key for its new position in
+            self.hash ^= self.card_key(collection_a, position_a + i, card) ^ self.card_key(collection_b, position_b + i, card)
             collection_a.remove(card)
             collection_b.add(card)
 
@@ -351,8 +503,8 @@ class Board:
             # store each collection for easier referencing
             collection_a = self.tableau[self.columns.index(a[0].upper())]
             collection_b = self.tableau[self.columns.index(b.upper())]
-            # if the index is not valid then cancel and return number representing invalid move
-            if not collection_a.check_index(int(a[1:]) - 1):
+            # if the row is not a number or the index is not valid then cancel and return number representing invalid move
+            if not a[1:].isdigit() or not collection_a.check_index(int(a[1:]) - 1):
                 return -1
             # if the card being moved is not shown then return number representing invalid move
             a_index = int(a[1:]) - 1
@@ -373,6 +525,9 @@ class Board:
             # store each collection for easier referencing
             collection_a = self.foundations[index - 1]
             collection_b = self.tableau[self.columns.index(b.upper())]
+            # an empty foundation has no card to move
+            if collection_a.size() == 0:
+                return -1
             a_index = -1
             # create a move object
             move_obj = Move('foundation', 'tableau')
@@ -400,14 +555,14 @@ class Board:
                 # if the collection cannot be found then return invalid command error
                 if collection_b == 0:
                     return -1
+                # create a move object
+                move_obj = Move('waste', 'foundation')
                 # check if foundation is empty and if so make sure the card is ace and move it over
-                result = self.foundation_ace(collection_a, collection_b, card)
+                result = self.foundation_ace(collection_a, collection_b, card, move_obj)
                 if result == -1:
                     return -1
                 elif result == 1:
-                    return Move('waste', 'foundation')
-                # create a move object - in the case the card being moved is not an ACE
-                move_obj = Move('waste', 'foundation')
+                    return move_obj
             else:
                 return -1
 
@@ -425,29 +580,31 @@ class Board:
             # if the collection cannot be found then return invalid command error
             if collection_b == 0:
                 return 0
+            # create a move object
+            move_obj = Move('tableau', 'foundation')
             # check if foundation is empty and if so make sure the card is ace and move it over
-            result = self.foundation_ace(collection_a, collection_b, card)
+            result = self.foundation_ace(collection_a, collection_b, card, move_obj)
             if result == -1:
                 return -1
             elif result == 1:
-                return Move('tableau', 'foundation')
-            # create a move object - in the case the card being moved is not an ACE
-            move_obj = Move('tableau', 'foundation')
+                return move_obj
         else:
             return -1
 
         # store a list of the card(s) to be moved and also take note of the first card for easier referencing
         cards_moving = collection_a.get_cards()[a_index:]
         first_card = cards_moving[0]
+        self.set_piles(move_obj, collection_a, collection_b, len(cards_moving))
 
         # if the destination collection is empty then make sure the first card being moved is a king
         if collection_b.size() == 0:
             # checks if card is a king
             if first_card.get_rank() == 12:
                 # moves the cards over
-                Board.move_cards(collection_a, collection_b, cards_moving)
+                self.move_cards(collection_a, collection_b, cards_moving)
                 # makes the card at end of old collection be visible/shown
-                Board.last_card_shown(collection_a.get_card(-1), move_obj)
+                self.last_card_shown(collection_a.get_card(-1), move_obj)
+                return move_obj
             else:
                 return 0
 
@@ -457,25 +614,31 @@ class Board:
             if isinstance(collection_b, Foundation):
                 # if card is being sent to the correct foundation then move the card over
                 if first_card.get_suit() == collection_b.get_suit():
-                    Board.move_cards(collection_a, collection_b, cards_moving)
+                    self.move_cards(collection_a, collection_b, cards_moving)
                     # makes the card at end of old collection be visible/shown
-                    Board.last_card_shown(collection_a.get_card(-1), move_obj)
+                    self.last_card_shown(collection_a.get_card(-1), move_obj)
+                # nothing was moved, so there is no move to score or undo
+                else:
+                    return 0
 
             # if card is being sent to a tableau pile
             else:
                 # if the card alternates in colour the move the card(s) over
                 if first_card.get_suit().get_colour() != collection_b.get_card(-1).get_suit().get_colour():
                     # move the cards over
-                    Board.move_cards(collection_a, collection_b, cards_moving)
+                    self.move_cards(collection_a, collection_b, cards_moving)
                     # makes the card at end of old collection be visible/shown
-                    Board.last_card_shown(collection_a.get_card(-1), move_obj)
+                    self.last_card_shown(collection_a.get_card(-1), move_obj)
+                # nothing was moved, so there is no move to score or undo
+                else:
+                    return 0
 
         # if the destination is a foundation and the card being moved is one rank higher than destination
         elif isinstance(collection_b, Foundation) and first_card.get_rank() - 1 == collection_b.get_card(-1).get_rank():
             # move the card over
-            Board.move_cards(collection_a, collection_b, cards_moving)
+            self.move_cards(collection_a, collection_b, cards_moving)
             # makes the card at end of old collection be visible/shown
-            Board.last_card_shown(collection_a.get_card(-1), move_obj)
+            self.last_card_shown(collection_a.get_card(-1), move_obj)
 
         # return 0 if nothing can be done to display invalid move error message to user
         else:
@@ -484,42 +647,260 @@ class Board:
         # if move was successful return a move object - created during args checking
         return move_obj
 
+    def apply(self, move):
+        """ Function to play a move again after it has been undone
+
+        Arguments:
+            move: a move returned by Board.move or passed to Board.draw
+        """
+
+        if move.initial == 'deck':
+            if move.deck_recylced:
+                self.recycle(self.waste, self.deck)
+            for i in range(move.count):
+                card = self.deck.get_card(-1)
+                self.move_cards(self.deck, self.waste, [card])
+                self.show_card(card)
+        else:
+            collection_a, collection_b = self.piles[move.source], self.piles[move.target]
+            self.move_cards(collection_a, collection_b, collection_a.get_cards()[-move.count:])
+            if move.card_shown:
+                self.show_card(collection_a.get_card(-1))
+
+    def revert(self, move):
+        """ Function to undo a move, putting the board back to how it was before the move
+
+        Arguments:
+            move: the last move applied to the board
+        """
+
+        if move.initial == 'deck':
+            for i in range(move.count):
+                card = self.waste.get_card(-1)
+                if move.draw_shown:
+                    self.hide_card(card)
+                self.move_cards(self.waste, self.deck, [card])
+            if move.deck_recylced:
+                self.recycle(self.deck, self.waste)
+        else:
+            collection_a, collection_b = self.piles[move.source], self.piles[move.target]
+            if move.card_shown:
+                self.hide_card(collection_a.get_card(-1))
+            self.move_cards(collection_b, collection_a, collection_b.get_cards()[-move.count:])
+
+    def summarise(self, index):
+        # the parts of a pile that decide which moves can be made from and onto it
+        collection = self.piles[index]
+        # foundations only need their size as the next card must be the next rank of the suit
+        if isinstance(collection, Foundation):
+            return collection.size()
+        top = Board.card_number(collection.get_card(-1)) if collection.size() > 0 else None
+        # the tableau also needs each face up card which could be moved along with the cards above it
+        if collection in self.tableau:
+            run = []
+            for position in range(collection.size() - 1, -1, -1):
+                card = collection.get_card(position)
+                if not card.is_shown():
+                    break
+                run.append((position, Board.card_number(card)))
+            hidden = collection.size() - len(run)
+            return top, run, hidden
+        return top
+
+    def legal_moves(self):
+        """ Function to find every move which can be made without changing the board
+
+        Only piles which have changed since the last call are scanned again.
+
+        Returns:
+            a list of Move objects with the source, target and count of cards for each move,
+            card_shown is set on moves which would turn over a card
+        """
+
+        for index in self.changed:
+            self.summaries[index] = self.summarise(index)
+        self.changed.clear()
+
+        # which tableau piles each top card is on and which piles are empty
+        tops, empty = {}, []
+        for index in range(6, 13):
+            top = self.summaries[index][0]
+            if top is None:
+                empty.append(index)
+            else:
+                tops[top] = index
+
+        def destinations(card):
+            # tableau piles the card could be placed onto, kings can also go to an empty pile
+            piles = [tops[target] for target in stack_targets[card] if target in tops]
+            if card % 13 == 12:
+                piles += empty
+            return piles
+
+        moves = []
+        foundation_sizes = self.summaries[2:6]
+        # tableau -> tableau and tableau -> foundation
+        for index in range(6, 13):
+            top, run, hidden = self.summaries[index]
+            for position, card in run:
+                count = len(run) - (position - hidden)
+                shown = position == hidden and hidden > 0
+                for target in destinations(card):
+                    if target != index:
+                        moves.append(Move('tableau', 'tableau', shown, index, target, count))
+            if top is not None and foundation_sizes[top // 13] == top % 13:
+                moves.append(Move('tableau', 'foundation', len(run) == 1 and hidden > 0, index, 2 + top // 13))
+        # waste -> tableau and waste -> foundation
+        top = self.summaries[1]
+        if top is not None:
+            for target in destinations(top):
+                moves.append(Move('waste', 'tableau', False, 1, target))
+            if foundation_sizes[top // 13] == top % 13:
+                moves.append(Move('waste', 'foundation', False, 1, 2 + top // 13))
+        # foundation -> tableau
+        for suit, size in enumerate(foundation_sizes):
+            if size > 0:
+                for target in destinations(suit * 13 + size - 1):
+                    moves.append(Move('foundation', 'tableau', False, 2 + suit, target))
+        return moves
+
+    def is_safe(card, foundation_sizes):
+        # a card can always go to the foundation when no card still in play could be placed on it, the solver uses this too
+        rank, suit = card % 13, card // 13
+        if rank <= 1:
+            return True
+        for other in range(4):
+            if suit_colours[other] != suit_colours[suit] and foundation_sizes[other] < rank:
+                return False
+            if other != suit and suit_colours[other] == suit_colours[suit] and foundation_sizes[other] < rank - 1:
+                return False
+        return True
+
+    def foundation_moves(self, safe = False):
+        """ Function to find the moves of the waste's and tableau's top cards onto the foundations
+
+        Arguments:
+            safe: only give the moves of cards which are safe to put on the foundations
+
+        Returns:
+            a list of Move objects which can be played with Board.apply
+        """
+
+        foundation_sizes = [foundation.size() for foundation in self.foundations]
+        moves = []
+        for index in range(1, 13):
+            collection = self.piles[index]
+            if 2 <= index < 6 or collection.size() == 0:
+                continue
+            card = Board.card_number(collection.get_card(-1))
+            if foundation_sizes[card // 13] != card % 13 or (safe and not Board.is_safe(card, foundation_sizes)):
+                continue
+            if index == 1:
+                moves.append(Move('waste', 'foundation', False, 1, 2 + card // 13))
+            else:
+                shown = collection.size() > 1 and not collection.get_cards()[-2].is_shown()
+                moves.append(Move('tableau', 'foundation', shown, index, 2 + card // 13))
+        return moves
+
+    def can_auto_finish(self):
+        # the game is as good as won once the deck and waste are empty and every card in the tableau is face up,
+        # each pile is then a single run and the lowest card left is always on top of one, so foundation moves alone finish it
+        if self.deck.size() > 0 or self.waste.size() > 0:
+            return False
+        return all(card.is_shown() for collection in self.tableau for card in collection.get_cards())
+
+    def command(self, move):
+        # turns a move from legal_moves into the command a player would type for Board.move
+        if move.initial == 'tableau':
+            collection = self.piles[move.source]
+            a = self.columns[move.source - 6]
+            if move.destination == 'tableau':
+                a += str(collection.size() - move.count + 1)
+        elif move.initial == 'waste':
+            a = 'W'
+        else:
+            a = f'*{move.source - 1}'
+        b = self.columns[move.target - 6] if move.destination == 'tableau' else '*'
+        return f'{a} {b}'
+
     def set_message(self, message):
         self.message = message
 
-    def display(self, username, score):
-        # clear the terminal for the user
-        Game.clear()
+    def frame(self, username, score):
+        """ Function to lay out the board as rows of cells for the renderer
+
+        Arguments:
+            username: the user who is playing
+            score: the players score
+
+        Returns:
+            a list of rows, each row is a list of the strings (cells) which make up the line
+        """
+
         # setup basic lines to be printed to output
-        horizontal_rule = '--------------------------------\n'
-        top = f' {username} {score} '.center(len(horizontal_rule) - 1, '-') + '\n'
-        title = ' Python Klondike '.center(len(horizontal_rule) - 1, '-') + '\n'
-        deck_foundation = f'{self.deck}->[{self.waste}] | {{{self.foundations[0]}}} {{{self.foundations[1]}}} {{{self.foundations[2]}}} {{{self.foundations[3]}}}\n'
-        column_letters = '    ' + '   '.join(self.columns) + '\n'
-        # concatinate each of the lines to an output variable
-        output = top + title + deck_foundation + horizontal_rule + column_letters
+        horizontal_rule = '--------------------------------'
+        top = f' {username} {score} '.center(len(horizontal_rule), '-')
+        title = ' Python Klondike '.center(len(horizontal_rule), '-')
+        deck_foundation = [f'{self.deck}->[', str(self.waste), '] |'] + [f' {{{foundation}}}' for foundation in self.foundations]
+        column_letters = '    ' + '   '.join(self.columns)
+        rows = [[top], [title], deck_foundation, [horizontal_rule], [column_letters]]
         # find out which of the tableau's are the largest and use to to determine how many rows there will be
-        rows = max([collection.size() for collection in self.tableau])
-        for i in range(rows):
-            # concatinate the row number
-            output += f'{i + 1}.'.ljust(3, ' ')
+        for i in range(max([collection.size() for collection in self.tableau])):
+            # each row starts with the row number followed by a cell for each tableau pile
+            row = [f'{i + 1}.'.ljust(3, ' ')]
             for collection in self.tableau:
                 # get the card if there is one
                 card = collection.get_card(i)
-                # if there is a card then concatinate it in a specific style with spaces following it
+                # if there is a card then add it in a specific style with spaces following it
                 if card:
                     if card.is_shown():
-                        output += str(card) + ' ' * (3 - len(str(card.get_value())))
+                        row.append(str(card) + ' ' * (3 - len(str(card.get_value()))))
                     else:
-                        output += str(card) + '  '
-                # when there is not a card just append spaces
+                        row.append(str(card) + '  ')
+                # when there is not a card just add spaces
                 else:
-                    output += ' ' * 4
-            # append a newline after each row is concatinated
-            output += '\n'
-        # concatinate a line and the message to be displayed to the user then print it out
-        output += horizontal_rule + self.message + '\n'
-        print(output)
+                    row.append(' ' * 4)
+            rows.append(row)
+        # finish with a line, the message to be displayed to the user and a blank line before the prompt
+        rows += [[horizontal_rule], [self.message], ['']]
+        return rows
+
+    def display(self, username, score):
+        # only the parts of the board which changed since it was last displayed are redrawn
+        with profiling.section('klondike.display'):
+            self.renderer.draw(self.frame(username, score))
+
+    def place(self, piles):
+        """ Function to lay the board's own cards out as the packed piles say, used to rebuild a saved board
+
+        Arguments:
+            piles: 13 sequences of packed cards (see pack), one for each pile in the order of Board.piles
+
+        Raises:
+            ValueError: if the piles do not hold every card exactly once
+        """
+
+        cards = {Board.card_number(card): card for collection in self.piles for card in collection.get_cards()}
+        if sorted(number & ~HIDDEN for pile in piles for number in pile) != list(range(52)):
+            raise ValueError('the board does not have every card exactly once')
+        for collection, pile in zip(self.piles, piles):
+            collection.cards = [cards[number & ~HIDDEN] for number in pile]
+            for number, card in zip(pile, collection.cards):
+                card.shown = not number & HIDDEN
+        self.hash = self.compute_hash()
+        self.changed.update(range(len(self.piles)))
+
+
+# flag set on a packed card when it is facing down
+HIDDEN = 0x40
+
+# times a position has to come up before the player is told they are going round in circles
+REPEAT_LIMIT = 3
+
+
+def pack(card):
+    # packs a card into a byte, its card number with HIDDEN set when it is facing down
+    return Board.card_number(card) | (0 if card.is_shown() else HIDDEN)
 
 
 class Game:
@@ -529,31 +910,47 @@ class Game:
         board: the board with all the different piles of cards
         score: the players score during the game
         moves: a list containing all the moves done during the game
+        undone: a list of the moves which have been undone, most recent last, cleared when a new move is made
         start_time: the time the game was initialised
         username: the user who is playing
+        positions: dictionary of board hashes to how many times the board has been in that position
+        repeats: how many times the position reached by the last move has come up, 0 when the last command made no move
+        save_path: file the game is saved to after every command, None to not save it
+        auto_finish: whether the rest of the cards are put on the foundations once the game can no longer be lost
+        auto_foundation: whether cards which are safe to put on the foundations are moved there after every move
     """
 
-    def __init__(self, username):
-        self.board = Board()
+    def __init__(self, username, deal = None, auto_finish = True, auto_foundation = False):
+        self.board = Board(deal)
         self.score = 0
         self.moves = []
+        self.undone = []
+        self.positions = {}
+        self.repeats = 0
         self.start_time = datetime.datetime.now().time()
         self.username = username
+        self.save_path = None
+        self.auto_finish = auto_finish
+        self.auto_foundation = auto_foundation
 
     def clear():
-        # checks the platform and if windows uses 'cls' command otherwise 'clear' command
-        if sys.platform == 'win32':
-            os.system('cls')
-        else:
-            os.system('clear')
+        # clears the terminal with escape codes rather than running a 'clear' or 'cls' command
+        screen.clear()
+
+    def help_text(self):
+        # the commands, scoring and deal number shown on the help page
+        return Board.help + '\n' + Board.scoring + '\n' + f'Deal number: {self.board.deck.deal}\n'
 
     def help(self):
         # clears the terminal and prints out the help message
         Game.clear()
-        print(Board.help + '\n' + Board.scoring)
+        print(self.help_text())
         input('Type anything and press enter to continue.')
+        # the help message replaced the board so it has to be drawn again in full
+        self.board.renderer.reset()
 
     def update_score(self, move):
+        score = self.score
         if move.initial == 'waste':
             if move.destination == 'tableau':
                 self.score += 5
@@ -574,74 +971,478 @@ class Game:
             return
         if move.card_shown:
             self.score += 5
+        # keep the change in score so it can be taken off again if the move is undone
+        move.points = self.score - score
+        self.moves.append(move)
+        self.undone.clear()
+
+    def undo(self):
+        # reverts the last move and its score, returns 0 if there is nothing to undo
+        if not self.moves:
+            return 0
+        move = self.moves.pop()
+        self.board.revert(move)
+        self.score -= move.points
+        self.undone.append(move)
+        return 1
+
+    def redo(self):
+        # plays the last undone move again, returns 0 if there is nothing to redo
+        if not self.undone:
+            return 0
+        move = self.undone.pop()
+        self.board.apply(move)
+        self.score += move.points
         self.moves.append(move)
+        return 1
+
+    def auto_moves(self):
+        """ Function to play the foundation moves the auto rules allow, all at once so the board is drawn only once after
+
+        Returns:
+            the number of moves played, each is scored and can be undone like any other move
+        """
+
+        played = 0
+        finishing = self.auto_finish and self.board.can_auto_finish()
+        while finishing or self.auto_foundation:
+            moves = self.board.foundation_moves(safe = not finishing)
+            if not moves:
+                break
+            for move in moves:
+                self.board.apply(move)
+                self.update_score(move)
+                played += 1
+            finishing = finishing or (self.auto_finish and self.board.can_auto_finish())
+        return played
+
+    def record_position(self):
+        # counts the times the board has been in its current position and returns the count
+        self.positions[self.board.hash] = self.positions.get(self.board.hash, 0) + 1
+        self.repeats = self.positions[self.board.hash]
+        return self.repeats
+
+    def checkpoint(self, result):
+        # saves the game after a command so it can be carried on later, a won game has nothing left to carry on
+        if self.save_path is None:
+            return
+        if result == 'won':
+            if os.path.exists(self.save_path):
+                os.remove(self.save_path)
+        else:
+            write_save(self, self.save_path)
 
     def start(self):
         # sets up the board by dealing out to the tableau piles
         self.board.setup()
+        self.record_position()
+        self.play()
+
+    def play(self):
         # sets up infinite loop which can only be broken when users issues the quit command, an error occurs or the game is won
         while True:
             # prints out the display
             self.board.display(self.username, self.score)
-            # takes in the user input
+            # takes in the user input and carries out the command
             user_input = input('Enter Move: ')
+            with profiling.section('klondike.command'):
+                result = self.command(user_input)
+            self.checkpoint(result)
             # if the user issues the help command then a help message is displayed to them
-            if user_input.lower() == 'help':
+            if result == 'help':
                 self.help()
             # if the users issues the quit command then the game stops
-            elif user_input.lower() == 'quit':
+            elif result == 'quit':
                 print('Thanks for playing.')
                 break
-            # if the user isses the draw or dd command then a card is drawn and added to the waste pile
-            elif user_input.lower() == 'draw' or user_input.lower() == 'dd':
-                # create move object
-                move = Move('deck', 'waste')
+            # if the game has been won then congratulate the player and stop
+            elif result == 'won':
+                print('Congratulations you have won the game!')
+                break
+
+    def command(self, user_input):
+        """ Function to carry out a single command typed by the player
+
+        Arguments:
+            user_input: the line the player typed
+
+        Returns:
+            'help': if the player asked for the help message
+            'quit': if the player wants to stop playing
+            'won': if the command won the game
+            None: if the game carries on
+        """
+
+        moves = len(self.moves)
+        with profiling.section('klondike.parse'):
+            command = user_input.lower()
+            words = user_input.split()
+        # the help message and quitting are left to whatever is showing the game
+        if command == 'help':
+            return 'help'
+        elif command == 'quit':
+            return 'quit'
+        # if the user issues the undo or redo command then the last move is taken back or played again
+        elif command == 'undo':
+            if self.undo():
+                self.board.set_message('Move undone.')
+            else:
+                self.board.set_message('There are no moves to undo.')
+        elif command == 'redo':
+            if self.redo():
+                self.board.set_message('Move played again.')
+            else:
+                self.board.set_message('There are no moves to redo.')
+        # if the user isses the draw or dd command then a card is drawn and added to the waste pile
+        elif command == 'draw' or command == 'dd':
+            # create move object
+            move = Move('deck', 'waste')
+            with profiling.section('klondike.move'):
                 self.board.draw(move)
+            with profiling.section('klondike.score'):
                 self.update_score(move)
-            # if there are two arguments it's possible the user wants to move, so we issue the move command
-            elif len(user_input.split()) == 2:
-                a, b = user_input.split()
+        # if there are two arguments it's possible the user wants to move, so we issue the move command
+        elif len(words) == 2:
+            a, b = words
+            with profiling.section('klondike.move'):
                 result = self.board.move(a, b)
-                # based on the output then update the board message appropiately -1 invalid command, 0 invalid move, a move instance would indicate a successful move
-                if result == -1:
-                    self.board.set_message('Invalid command type \'help\' to see a list of commands.')
-                elif result == 0:
-                    self.board.set_message('Move could not be done as it\'s an invalid move.')
-                elif isinstance(result, Move):
+            # based on the output then update the board message appropiately -1 invalid command, 0 invalid move, a move instance would indicate a successful move
+            if result == -1:
+                self.board.set_message('Invalid command type \'help\' to see a list of commands.')
+            elif result == 0:
+                self.board.set_message('Move could not be done as it\'s an invalid move.')
+            elif isinstance(result, Move):
+                with profiling.section('klondike.score'):
                     self.update_score(result)
-                    self.board.set_message('Nice move! Remember if you need help to type \'help\'')
-            # if no valid command is entered then set the board message to reflect it
-            else:
-                self.board.set_message('Unknown command type \'help\' to see a list of commands.')
-            # checking for win conditions
-            done = True
-            # if any of the foundations do not contain a king on top then set done to False and game loop continues
-            for foundation in self.board.foundations:
-                if foundation.size() > 0:
-                    if foundation.get_card(-1).get_rank() != 12:
-                        done = False
-                        break
-                else:
+                self.board.set_message('Nice move! Remember if you need help to type \'help\'')
+        # if no valid command is entered then set the board message to reflect it
+        else:
+            self.board.set_message('Unknown command type \'help\' to see a list of commands.')
+        # the auto rules only follow a new move, so an undone move is not played straight back again
+        # only a new move counts towards the positions, undoing and redoing just go back over them
+        self.repeats = 0
+        if len(self.moves) > moves:
+            with profiling.section('klondike.auto'):
+                played = self.auto_moves()
+            if played:
+                self.board.set_message(f'Moved {played} card{"s" if played > 1 else ""} to the foundations for you.')
+            if self.record_position() >= REPEAT_LIMIT:
+                self.board.set_message(f'This position has come up {self.repeats} times, you may be going round in circles.')
+        # checking for win conditions
+        done = True
+        # if any of the foundations do not contain a king on top then set done to False and game loop continues
+        for foundation in self.board.foundations:
+            if foundation.size() > 0:
+                if foundation.get_card(-1).get_rank() != 12:
                     done = False
                     break
-            # if the deck and waste are empty then check for any cards which are not shwon if all cards are shown the game is finished and won
-            if self.board.deck.size() == 0 and self.board.waste.size() == 0:
-                for collection in self.board.tableau:
-                    for card in collection.get_cards():
-                        if card.is_shown():
-                            done = False
-                            break
-            # if done variable is true, means the player has won the game
-            if done:
-                print('Congratulations you have won the game!')
+            else:
+                done = False
                 break
+        # if the deck and waste are empty then check for any cards which are not shwon if all cards are shown the game is finished and won
+        if self.board.deck.size() == 0 and self.board.waste.size() == 0:
+            for collection in self.board.tableau:
+                for card in collection.get_cards():
+                    if card.is_shown():
+                        done = False
+                        break
+        # if done variable is true, means the player has won the game
+        if done:
+            return 'won'
+        return None
+
+
+class Session:
+    """ Class representing a game played a line at a time, so it can be driven by the server.
+
+    Attributes:
+        game: the game being played, None until the player has entered a username
+        deal: the deal number to play, a random deal when None
+        terminal: whether the output is going to a terminal which understands escape codes
+        output: buffer the board is drawn into before being handed back
+        prompt: what to show the player when waiting for their next line
+        showing_help: whether the help message is on the screen
+        finished: whether the game is over
+        save_path: file the game is saved to after every command and carried on from when it is started, None to not save it
+        auto_foundation: whether cards which are safe to put on the foundations are moved there after every move
+    """
+
+    def __init__(self, terminal = True, deal = None, save_path = None, auto_foundation = False):
+        self.game = None
+        self.deal = deal
+        self.terminal = terminal
+        self.output = io.StringIO()
+        self.prompt = 'Please enter a username: '
+        self.showing_help = False
+        self.finished = False
+        self.save_path = save_path
+        self.auto_foundation = auto_foundation
+
+    def start(self):
+        # a saved game is carried on straight away, there is no need to ask for the username again
+        if self.save_path and os.path.exists(self.save_path):
+            try:
+                self.game = read_save(self.save_path)
+            except (OSError, ValueError):
+                return 'The saved game could not be read, starting a new one.\n'
+            self.game.save_path = self.save_path
+            self.game.auto_foundation = self.auto_foundation
+            self.game.board.renderer = Renderer(self.output, self.terminal)
+            self.game.board.set_message('Welcome back, the game carries on from where it was saved.')
+            self.prompt = 'Enter Move: '
+            return self.frame()
+        return ''
+
+    def handle(self, line):
+        # the first line is the username, the game starts once it is known
+        if self.game is None:
+            self.game = Game(line, self.deal, auto_foundation = self.auto_foundation)
+            self.game.save_path = self.save_path
+            self.game.board.renderer = Renderer(self.output, self.terminal)
+            self.game.board.setup()
+            self.game.record_position()
+            self.prompt = 'Enter Move: '
+            return self.frame()
+        # any line goes back to the board from the help message, which has to be drawn again in full
+        if self.showing_help:
+            self.showing_help = False
+            self.prompt = 'Enter Move: '
+            self.game.board.renderer.reset()
+            return self.frame()
+        with profiling.section('klondike.command'):
+            result = self.game.command(line)
+        self.game.checkpoint(result)
+        if result == 'help':
+            self.showing_help = True
+            self.prompt = 'Type anything and press enter to continue.'
+            return screen.page(self.game.help_text(), self.terminal)
+        elif result == 'quit':
+            self.finished = True
+            return 'Thanks for playing.\n'
+        elif result == 'won':
+            self.finished = True
+            return 'Congratulations you have won the game!\n'
+        return self.frame()
+
+    def frame(self):
+        # draws the board into the buffer and hands back what was drawn
+        self.game.board.display(self.game.username, self.game.score)
+        text = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        return text
+
+
+def new_game(deal = None, username = 'headless', auto_finish = True, auto_foundation = False):
+    """ Function starting a game to be played without a screen, for bots, tests and replaying recorded commands
+
+    Returns:
+        the game and the events of starting it, each event is a tuple starting with its name
+    """
+    game = Game(username, deal, auto_finish, auto_foundation)
+    game.board.setup()
+    game.record_position()
+    return game, [('deal', game.board.deck.deal)]
+
+
+def step(game, command):
+    """ Function carrying out one command on a game without drawing anything
+
+    Returns:
+        the game and the events of the command: ('move', move, points) for every move made, ('message', text) for what
+        the board would tell the player, ('repeat', count) when the moves reached a position which has come up
+        REPEAT_LIMIT or more times, and ('help',), ('quit',) or ('won',) when the command returns them
+    """
+    moves = len(game.moves)
+    game.board.message = ''
+    result = game.command(command)
+    events = [('move', str(move), move.points) for move in game.moves[moves:]]
+    if game.board.message:
+        events.append(('message', game.board.message))
+    if game.repeats >= REPEAT_LIMIT:
+        events.append(('repeat', game.repeats))
+    if result is not None:
+        events.append((result,))
+    return game, events
+
+
+# saved games, all little endian:
+#   header   magic, version, deal, score, start time in microseconds since midnight, username length,
+#            number of moves played and number of moves undone
+#   username utf-8
+#   board    the size of each of the 13 piles then every card packed into a byte (see pack)
+#   moves    the moves played, oldest first, then the undone moves, most recently undone last
+#   crc32    of everything before it
+# each move only keeps what it changed: a byte of its kind and flags, a byte of the piles it went between (not for
+# draws), a byte of the cards moved for tableau to tableau moves, and its change in score only when that is not the
+# usual score for the move, so most moves take two bytes and a draw one
+
+SAVE_MAGIC = b'KLDK'
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct('<4sBQiQBII')
+
+# the kinds of move, by the number they are saved as
+MOVE_KINDS = [('deck', 'waste'), ('waste', 'tableau'), ('waste', 'foundation'), ('tableau', 'foundation'), ('tableau', 'tableau'), ('foundation', 'tableau')]
+MOVE_NUMBERS = {kind: number for number, kind in enumerate(MOVE_KINDS)}
+
+# the points each kind of move scores before the 5 for turning a card over, as in Game.update_score
+MOVE_POINTS = [0, 5, 10, 10, 0, -15]
+
+# the flags in the first byte of a saved move, under them is the kind
+SHOWN, RECYCLED, DRAW_SHOWN, POINTS, DREW = 0x08, 0x10, 0x20, 0x40, 0x80
+
+
+def encode_move(move):
+    # the bytes a move is saved as, worked out once and kept on the move as it never changes once played
+    if move.encoded is None:
+        kind = MOVE_NUMBERS[(move.initial, move.destination)]
+        flags = kind | (SHOWN if move.card_shown else 0) | (RECYCLED if move.deck_recylced else 0) | (DRAW_SHOWN if move.draw_shown else 0)
+        data = bytearray(1)
+        if kind == 0:
+            # a draw turns over at most one card, or none when the whole deck was on the waste pile
+            flags |= DREW if move.count else 0
+        else:
+            data.append(move.source << 4 | move.target)
+            if kind == MOVE_NUMBERS[('tableau', 'tableau')]:
+                data.append(move.count)
+        # the score only changes by something other than the usual points when recycling takes it below 0
+        if move.points != MOVE_POINTS[kind] + (5 if move.card_shown else 0):
+            flags |= POINTS
+            data += struct.pack('<b', move.points)
+        data[0] = flags
+        move.encoded = bytes(data)
+    return move.encoded
+
+
+def decode_move(data, offset):
+    # builds a move back from its bytes, returns the move and the offset after it
+    start = offset
+    flags = data[offset]
+    offset += 1
+    initial, destination = MOVE_KINDS[flags & 0x07]
+    move = Move(initial, destination, bool(flags & SHOWN))
+    if initial == 'deck':
+        move.count = 1 if flags & DREW else 0
+    else:
+        move.source, move.target = data[offset] >> 4, data[offset] & 0x0f
+        offset += 1
+        if (initial, destination) == ('tableau', 'tableau'):
+            move.count = data[offset]
+            offset += 1
+    move.deck_recylced = bool(flags & RECYCLED)
+    move.draw_shown = bool(flags & DRAW_SHOWN)
+    if flags & POINTS:
+        move.points = struct.unpack_from('<b', data, offset)[0]
+        offset += 1
+    else:
+        move.points = MOVE_POINTS[flags & 0x07] + (5 if move.card_shown else 0)
+    # the bytes just read are what the move would be saved as again
+    move.encoded = bytes(data[start:offset])
+    return move, offset
+
+
+def save_game(game):
+    """ Function packing a game into the bytes it is saved as
+
+    Returns:
+        bytes with the deal, score, start time, username, every pile of the board and every move played and undone
+    """
+
+    start = game.start_time
+    username = game.username.encode('utf-8')[:255]
+    header = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, game.board.deck.deal, game.score,
+                              ((start.hour * 60 + start.minute) * 60 + start.second) * 1000000 + start.microsecond,
+                              len(username), len(game.moves), len(game.undone))
+    piles = game.board.piles
+    board = bytes([collection.size() for collection in piles] + [pack(card) for collection in piles for card in collection.cards])
+    data = b''.join([header, username, board] + [encode_move(move) for move in game.moves] + [encode_move(move) for move in game.undone])
+    return data + struct.pack('<I', zlib.crc32(data))
+
+
+def load_game(data):
+    """ Function building a game back from the bytes save_game packed it into
+
+    The board's position counts start again from the board as it was saved.
+
+    Returns:
+        the game, ready to carry on playing
+
+    Raises:
+        ValueError: if the data is not a saved game, is from another version or is damaged
+    """
+
+    if len(data) < SAVE_HEADER.size + 4 or struct.unpack_from('<I', data, len(data) - 4)[0] != zlib.crc32(data[:-4]):
+        raise ValueError('not a saved game or the save is damaged')
+    magic, version, deal, score, start, name_length, played, undone = SAVE_HEADER.unpack_from(data, 0)
+    if magic != SAVE_MAGIC or version != SAVE_VERSION:
+        raise ValueError('not a saved game or saved by another version')
+    offset = SAVE_HEADER.size
+    game = Game(bytes(data[offset:offset + name_length]).decode('utf-8', errors = 'replace'), deal)
+    offset += name_length
+    game.score = score
+    seconds, microsecond = divmod(start, 1000000)
+    game.start_time = datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60, microsecond)
+    # the cards of the deal are put back where they were saved, so no new card objects are needed
+    sizes = data[offset:offset + len(game.board.piles)]
+    offset += len(sizes)
+    piles = []
+    for size in sizes:
+        piles.append(data[offset:offset + size])
+        offset += size
+    game.board.place(piles)
+    for moves, count in ((game.moves, played), (game.undone, undone)):
+        for i in range(count):
+            move, offset = decode_move(data, offset)
+            moves.append(move)
+    game.record_position()
+    return game
+
+
+def write_save(game, path):
+    # saves the game to a temporary file first and swaps it in, so the save is never left half written
+    with open(path + '.tmp', 'wb') as f:
+        f.write(save_game(game))
+    os.replace(path + '.tmp', path)
+
+
+def read_save(path):
+    with open(path, 'rb') as f:
+        return load_game(f.read())
 
 
 def main():
+    # a deal number can be given to play a particular deal again, and --profile records where the time goes
+    args = profiling.take_flag(sys.argv[1:])
+    # --auto-foundation moves cards which are safe to put on the foundations there after every move
+    auto_foundation = '--auto-foundation' in args
+    args = [arg for arg in args if arg != '--auto-foundation']
+    # --save with a file saves the game after every command, and carries on the game saved there if there is one
+    save_path = None
+    if '--save' in args:
+        index = args.index('--save')
+        if index + 1 >= len(args):
+            sys.exit('--save needs the file to save the game to')
+        save_path = args[index + 1]
+        del args[index:index + 2]
+    if save_path and os.path.exists(save_path):
+        try:
+            game = read_save(save_path)
+        except (OSError, ValueError) as error:
+            sys.exit(f'Could not carry on the game saved in {save_path}: {error}')
+        game.save_path = save_path
+        game.auto_foundation = auto_foundation
+        game.board.set_message('Welcome back, the game carries on from where it was saved.')
+        game.play()
+        return
+    try:
+        deal = parse_deal(args[0]) if args else None
+    except ValueError as error:
+        sys.exit(f'Usage: python3 main.py [deal number] [--save FILE] [--auto-foundation] [--profile]: {error}')
     # take in the players username
     username = input('Please enter a username: ')
     # create the game object
-    game = Game(username)
+    game = Game(username, deal, auto_foundation = auto_foundation)
+    game.save_path = save_path
     # start the game
     game.start()
 
@@ -0,0 +1,170 @@
+""" Batch simulator for Klondike deals.
+
+Deals a range of seeded games and plays each one with a policy instead of a player,
+spreading the games over a pool of processes. The result of every game is written as
+a line of JSON and a summary of the win rate, scores, moves and time per game is
+printed at the end.
+
+Policies:
+    greedy: always takes the most useful looking move, draws when there is nothing else to do
+    random: picks any legal move or a draw at random
+    solver: plays the winning line found by solver.py, or falls back to greedy if none was found
+
+Usage: python3 sim.py --games 10000 --policy greedy --output results.jsonl
+"""
+
+import argparse, json, multiprocessing, random, sys, time
+
+from main import Game, Move
+from solver import Solver
+
+# order the greedy policy tries moves in, lower is better
+move_priority = {
+    ('tableau', 'foundation'): 0,
+    ('waste', 'foundation'): 1,
+    ('tableau', 'tableau'): 2,
+    ('waste', 'tableau'): 3,
+}
+
+
+def is_won(board):
+    return all(foundation.size() == 13 for foundation in board.foundations)
+
+
+def greedy(board, rng):
+    # foundation moves first, then moves which turn over a card or empty a pile, then moves from the waste
+    options = []
+    for move in board.legal_moves():
+        priority = move_priority.get((move.initial, move.destination))
+        if priority is None:
+            continue
+        if move.initial == 'tableau' and move.destination == 'tableau':
+            # moving a run between tableau piles only helps if it turns over a card or clears a pile for a king
+            emptied = board.piles[move.source].size() == move.count
+            if not move.card_shown and not (emptied and board.piles[move.source].get_card(0).get_rank() != 12):
+                continue
+        if move.card_shown:
+            priority -= 0.5
+        options.append((priority, move))
+    if options:
+        return min(options, key = lambda option: option[0])[1]
+    return None
+
+
+def random_policy(board, rng):
+    # a draw is one more choice alongside every legal move
+    moves = board.legal_moves()
+    choice = rng.randrange(len(moves) + 1)
+    return moves[choice] if choice < len(moves) else None
+
+
+policies = {
+    'greedy' : greedy,
+    'random' : random_policy,
+}
+
+
+def play(game, policy, rng, max_moves):
+    """ Function to play a game with a policy until it is won or stuck
+
+    Arguments:
+        game: the game to play, the board must already be set up
+        policy: function taking the board and a random number generator and returning a move or None to draw
+        rng: random number generator the policy can use
+        max_moves: the most moves to play before giving up
+
+    Returns:
+        the number of moves played
+    """
+
+    board = game.board
+    # draws since the last move, once every card in the deck and waste has been seen without a move the game is stuck
+    draws = 0
+    moves = 0
+    while moves < max_moves and not is_won(board):
+        move = policy(board, rng)
+        if move is None:
+            if draws > board.deck.size() + board.waste.size():
+                break
+            move = Move('deck', 'waste')
+            board.draw(move)
+            draws += 1
+        else:
+            board.apply(move)
+            draws = 0
+        game.update_score(move)
+        moves += 1
+    return moves
+
+
+def run(task):
+    """ Function to deal and play a single game, run inside the worker processes
+
+    Arguments:
+        task: tuple of (seed, policy name, most moves to play, most states for the solver)
+
+    Returns:
+        a dictionary with the result of the game
+    """
+
+    seed, policy, max_moves, max_states = task
+    start_time = time.perf_counter()
+    game = Game('sim', seed)
+    game.board.setup()
+    rng = random.Random(seed)
+    if policy == 'solver':
+        solution = Solver(max_states).solve(game.board)
+        for command in solution.moves:
+            if command == 'dd':
+                move = Move('deck', 'waste')
+                game.board.draw(move)
+            else:
+                move = game.board.move(*command.split())
+            game.update_score(move)
+        moves = len(solution.moves) + play(game, greedy, rng, max_moves)
+    else:
+        moves = play(game, policies[policy], rng, max_moves)
+    return {
+        'seed' : seed,
+        'policy' : policy,
+        'won' : is_won(game.board),
+        'score' : game.score,
+        'moves' : moves,
+        'seconds' : time.perf_counter() - start_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Simulate a batch of Klondike deals.')
+    parser.add_argument('--games', type = int, default = 1000, help = 'number of games to play')
+    parser.add_argument('--seed', type = int, default = 0, help = 'deal number of the first deal, each deal after adds one')
+    parser.add_argument('--policy', choices = list(policies) + ['solver'], default = 'greedy', help = 'how moves are chosen')
+    parser.add_argument('--processes', type = int, default = None, help = 'number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--max-moves', type = int, default = 2000, help = 'moves to play before giving up on a game')
+    parser.add_argument('--max-states', type = int, default = 100000, help = 'states the solver visits before giving up on a deal')
+    parser.add_argument('--output', default = '-', help = 'file to write a JSON line per game to, - for stdout')
+    args = parser.parse_args()
+
+    tasks = [(seed, args.policy, args.max_moves, args.max_states) for seed in range(args.seed, args.seed + args.games)]
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    wins, score, moves, seconds = 0, 0, 0, 0
+    start_time = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        # results are written as soon as each game finishes rather than kept until the end
+        for result in pool.imap_unordered(run, tasks, chunksize = 16):
+            output.write(json.dumps(result) + '\n')
+            wins += result['won']
+            score += result['score']
+            moves += result['moves']
+            seconds += result['seconds']
+    elapsed = time.perf_counter() - start_time
+    if output is not sys.stdout:
+        output.close()
+
+    games = max(args.games, 1)
+    print(f'{args.games} games ({args.policy}): {wins / games:.2%} won, mean score {score / games:.1f}, mean moves {moves / games:.1f}', file = sys.stderr)
+    print(f'{seconds / games * 1000:.2f}ms per game, {args.games / max(elapsed, 1e-9):.1f} games/s', file = sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
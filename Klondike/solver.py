@@ -0,0 +1,267 @@
+""" Headless solver for Klondike boards.
+
+Searches a board from main.py for a winning sequence of moves using a depth first
+search over a lightweight copy of the board. Every state reached is stored in a
+transposition table keyed by a canonical form of the board so the same position
+reached through a different order of moves is only ever searched once.
+
+Solutions are given as the commands a player would type into the game, e.g. 'C4 A',
+'W *' or 'dd', so they can be replayed with Board.move and Board.draw.
+
+Usage: python3 solver.py --deals 100 --seed 1
+"""
+
+import argparse, time
+
+from main import HIDDEN, Board, Move, pack
+from state import RED
+
+
+def can_stack(card, onto):
+    # checks if the card can be placed onto another card in the tableau, one rank lower and alternate colour
+    return card % 13 + 1 == onto % 13 and RED[card // 13] != RED[onto // 13]
+
+
+class Solution:
+    """ Class representing the result of trying to solve a board.
+
+    Attributes:
+        status: 'won' if a solution was found, 'lost' if there is no solution, 'unknown' if the search limit was reached
+        moves: list of commands which win the game when status is 'won'
+        states: number of distinct states visited during the search
+        elapsed: number of seconds the search took
+    """
+
+    def __init__(self, status, moves, states, elapsed):
+        self.status = status
+        self.moves = moves
+        self.states = states
+        self.elapsed = elapsed
+
+    def __str__(self):
+        if self.status == 'won':
+            result = f'won in {len(self.moves)} moves'
+        else:
+            result = self.status
+        return f'{result}, {self.states} states, {self.elapsed:.3f}s'
+
+    def is_won(self):
+        return self.status == 'won'
+
+
+class Solver:
+    """ Class representing the search used to solve a board.
+
+    States are tuples of (tableau, foundations, deck, waste) where the tableau is 7 tuples of
+    card numbers (HIDDEN set when facing down), foundations are the number of cards on each
+    foundation pile and the deck and waste are tuples of card numbers with the top card last.
+
+    Attributes:
+        max_states: the most states to visit before giving up on a board
+    """
+
+    def __init__(self, max_states = 1000000):
+        self.max_states = max_states
+
+    def state(self, board):
+        # converts a board into the lightweight state used during the search
+        tableau = tuple(
+            tuple(pack(card) for card in collection.get_cards())
+            for collection in board.tableau
+        )
+        foundations = tuple(foundation.size() for foundation in board.foundations)
+        deck = tuple(Board.card_number(card) for card in board.deck.get_cards())
+        waste = tuple(Board.card_number(card) for card in board.waste.get_cards())
+        return tableau, foundations, deck, waste
+
+    def key(self, state):
+        # the order of the tableau piles does not change what can be won so they are sorted for the transposition table
+        tableau, foundations, deck, waste = state
+        return tuple(sorted(tableau)), foundations, deck, waste
+
+    def is_won(self, state):
+        return state[1] == (13, 13, 13, 13)
+
+    def children(self, state):
+        """ Function to find every state which can be reached with one move
+
+        Arguments:
+            state: the state to move from
+
+        Returns:
+            an iterator of (command, state) tuples ordered with the most promising moves first
+        """
+
+        tableau, foundations, deck, waste = state
+        # moves are sorted into buckets by priority, lowest bucket is tried first
+        buckets = [[] for i in range(8)]
+
+        def replace(pile_a, cards_a, pile_b = None, cards_b = None):
+            # builds a new tableau with either one or two of the piles swapped out
+            piles = list(tableau)
+            piles[pile_a] = cards_a
+            if pile_b is not None:
+                piles[pile_b] = cards_b
+            return tuple(piles)
+
+        def reveal(cards):
+            # turns over the last card of a pile if it is facing down
+            if cards and cards[-1] & HIDDEN:
+                return cards[:-1] + (cards[-1] & ~HIDDEN,), True
+            return cards, False
+
+        # tableau -> foundation
+        for i, cards in enumerate(tableau):
+            if cards and foundations[cards[-1] // 13] == cards[-1] % 13:
+                card = cards[-1]
+                remaining, shown = reveal(cards[:-1])
+                new_foundations = foundations[:card // 13] + (foundations[card // 13] + 1,) + foundations[card // 13 + 1:]
+                child = (f'{Board.columns[i]} *', (replace(i, remaining), new_foundations, deck, waste))
+                if Board.is_safe(card, foundations):
+                    return iter([child])
+                buckets[0 if shown else 3].append(child)
+
+        # waste -> foundation
+        if waste and foundations[waste[-1] // 13] == waste[-1] % 13:
+            card = waste[-1]
+            new_foundations = foundations[:card // 13] + (foundations[card // 13] + 1,) + foundations[card // 13 + 1:]
+            child = ('W *', (tableau, new_foundations, deck, waste[:-1]))
+            if Board.is_safe(card, foundations):
+                return iter([child])
+            buckets[2].append(child)
+
+        # tableau -> tableau
+        empty = [i for i, cards in enumerate(tableau) if not cards]
+        for i, cards in enumerate(tableau):
+            for index in range(len(cards) - 1, -1, -1):
+                card = cards[index]
+                if card & HIDDEN:
+                    break
+                remaining, shown = reveal(cards[:index])
+                # moves which turn over a card or clear a pile are the most useful
+                bucket = 1 if shown or index == 0 else 5
+                for j, other in enumerate(tableau):
+                    if j == i:
+                        continue
+                    if other:
+                        if not can_stack(card, other[-1]):
+                            continue
+                    # a king moving from the bottom of one pile to another empty pile gets nowhere
+                    elif card % 13 != 12 or index == 0 or j != empty[0]:
+                        continue
+                    command = f'{Board.columns[i]}{index + 1} {Board.columns[j]}'
+                    buckets[bucket].append((command, (replace(i, remaining, j, other + cards[index:]), foundations, deck, waste)))
+
+        # waste -> tableau
+        if waste:
+            card = waste[-1]
+            for j, other in enumerate(tableau):
+                if (other and can_stack(card, other[-1])) or (not other and card % 13 == 12 and j == empty[0]):
+                    buckets[4].append((f'W {Board.columns[j]}', (replace(j, other + (card,)), foundations, deck, waste[:-1])))
+
+        # foundation -> tableau
+        for suit, count in enumerate(foundations):
+            if count == 0:
+                continue
+            card = suit * 13 + count - 1
+            new_foundations = foundations[:suit] + (count - 1,) + foundations[suit + 1:]
+            for j, other in enumerate(tableau):
+                if (other and can_stack(card, other[-1])) or (not other and card % 13 == 12 and j == empty[0]):
+                    buckets[6].append((f'*{suit + 1} {Board.columns[j]}', (replace(j, other + (card,)), new_foundations, deck, waste)))
+
+        # draw, the waste is recycled back into the deck when the deck is empty
+        if deck:
+            buckets[7].append(('dd', (tableau, foundations, deck[:-1], waste + deck[-1:])))
+        elif len(waste) > 1:
+            recycled = waste[::-1]
+            buckets[7].append(('dd', (tableau, foundations, recycled[:-1], recycled[-1:])))
+
+        return (child for bucket in buckets for child in bucket)
+
+    def solve(self, board):
+        """ Function to search for a winning sequence of moves
+
+        Arguments:
+            board: the board to solve, it is not changed during the search
+
+        Returns:
+            a Solution with the commands to win the game if one exists
+        """
+
+        start_time = time.perf_counter()
+        start = self.state(board)
+        visited = {self.key(start)}
+        # each entry on the stack is the iterator of moves still to try from that point on the path
+        stack = [self.children(start)]
+        path = []
+        status = 'lost'
+        if self.is_won(start):
+            status, stack = 'won', []
+        while stack:
+            for command, state in stack[-1]:
+                key = self.key(state)
+                if key in visited:
+                    continue
+                visited.add(key)
+                path.append(command)
+                if self.is_won(state):
+                    status, stack = 'won', []
+                elif len(visited) >= self.max_states:
+                    status, stack = 'unknown', []
+                else:
+                    stack.append(self.children(state))
+                break
+            else:
+                # every move from this point has been searched so step back
+                stack.pop()
+                if path:
+                    path.pop()
+        moves = path if status == 'won' else []
+        return Solution(status, moves, len(visited), time.perf_counter() - start_time)
+
+
+def replay(board, commands):
+    """ Function to play a list of commands on a board
+
+    Arguments:
+        board: the board to play the commands on
+        commands: list of commands in the same format a player would type them
+
+    Returns:
+        1: if every command was a valid move
+        0: if one of the commands could not be played
+    """
+
+    for command in commands:
+        if command == 'dd':
+            board.draw(Move('deck', 'waste'))
+        elif not isinstance(board.move(*command.split()), Move):
+            return 0
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Solve a batch of Klondike deals.')
+    parser.add_argument('--deals', type = int, default = 10, help = 'number of deals to solve')
+    parser.add_argument('--seed', type = int, default = 0, help = 'deal number of the first deal, each deal after adds one')
+    parser.add_argument('--max-states', type = int, default = 1000000, help = 'states to visit before giving up on a deal')
+    args = parser.parse_args()
+
+    solver = Solver(args.max_states)
+    results = {'won' : 0, 'lost' : 0, 'unknown' : 0}
+    total_states, total_time = 0, 0
+    for seed in range(args.seed, args.seed + args.deals):
+        board = Board(seed)
+        board.setup()
+        solution = solver.solve(board)
+        results[solution.status] += 1
+        total_states += solution.states
+        total_time += solution.elapsed
+        print(f'deal {seed}: {solution} ({solution.states / max(solution.elapsed, 1e-9):.0f} states/s)')
+
+    print(f"{args.deals} deals: {results['won']} won, {results['lost']} lost, {results['unknown']} unknown")
+    print(f'{args.deals / max(total_time, 1e-9):.2f} solves/s, {total_states / max(total_time, 1e-9):.0f} states/s')
+
+
+if __name__ == '__main__':
+    main()
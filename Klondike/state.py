@@ -0,0 +1,117 @@
+""" Compact immutable representation of a Klondike board.
+
+Every card is packed into a single byte by main.pack, suit index * 13 + rank, with the HIDDEN
+bit set when the card is facing down. The 13 piles of the board are stored one after another in
+a bytes buffer which starts with the size of each pile, so a whole board takes at most
+65 bytes and can be hashed, compared and shared without copying any card objects.
+"""
+
+from array import array
+
+from main import HIDDEN, Board, Deck, deal_order, pack
+
+# whether each suit (by its position in the deck) is red, used to check the colours alternate
+RED = tuple(suit.get_colour() == 'red' for suit in Deck.suits.values())
+
+# positions of each pile in the buffer
+DECK, WASTE = 0, 1
+FOUNDATIONS = range(2, 6)
+TABLEAU = range(6, 13)
+PILES = 13
+
+
+class State:
+    """ Class representing a board packed into bytes.
+
+    States are immutable, so copying one just returns the same object.
+
+    Attributes:
+        data: the sizes of the 13 piles followed by the cards in each pile, bottom card first
+    """
+
+    __slots__ = ('data', 'hash')
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.hash = hash(self.data)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return isinstance(other, State) and self.data == other.data
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f'State({self.data!r})'
+
+    @classmethod
+    def from_piles(cls, piles):
+        # builds a state from 13 sequences of card numbers in buffer order
+        data = array('B', [len(pile) for pile in piles])
+        for pile in piles:
+            data.extend(pile)
+        return cls(data)
+
+    @classmethod
+    def from_board(cls, board):
+        # packs each of the board's piles in buffer order
+        return cls.from_piles([[pack(card) for card in collection.get_cards()] for collection in board.piles])
+
+    @classmethod
+    def from_deal(cls, deal):
+        # deals straight from the card order in the same way as Board.setup, without building any card objects
+        deck = [number | HIDDEN for number in deal_order(deal)]
+        tableau = [[] for i in range(7)]
+        for i in range(7):
+            for j in range(i + 1):
+                tableau[i].append(deck.pop() & ~HIDDEN if i == j else deck.pop())
+        return cls.from_piles([deck, [], [], [], [], []] + tableau)
+
+    def to_board(self, deal = None):
+        """ Function to build a playable board from the state
+
+        Arguments:
+            deal: the deal number the state came from, so the board shows it, a random number when None
+
+        Returns:
+            a new Board with its cards in the same positions as the state
+        """
+
+        board = Board(deal)
+        board.place(self.piles())
+        return board
+
+    def pile(self, index):
+        # finds where the pile starts in the buffer by adding up the sizes of the piles before it
+        start = PILES + sum(self.data[:index])
+        return self.data[start:start + self.data[index]]
+
+    def piles(self):
+        # splits the buffer into each of its 13 piles
+        piles = []
+        start = PILES
+        for size in self.data[:PILES]:
+            piles.append(self.data[start:start + size])
+            start += size
+        return piles
+
+    def replace(self, changes):
+        """ Function to build a new state with some of the piles swapped out
+
+        Arguments:
+            changes: dictionary of pile index to the new card numbers for that pile
+
+        Returns:
+            a new State, this state is left unchanged
+        """
+
+        piles = self.piles()
+        for index, pile in changes.items():
+            piles[index] = pile
+        return State.from_piles(piles)
@@ -0,0 +1,112 @@
+# regression tests for the klondike board, run with python3 -m pytest
+
+import random
+
+import pytest
+
+import main
+
+
+def layout(board):
+    # every card on the board and whether it is face up, pile by pile
+    return [[(str(card.get_value()) + card.get_suit().name, card.is_shown()) for card in collection.get_cards()] for collection in board.piles]
+
+
+def test_undo_restores_deal():
+    # random commands, many of them moves which cannot be made, then every move undone must give back the deal
+    rng = random.Random(1)
+    for deal in range(50):
+        game = main.Game('test', deal)
+        game.board.setup()
+        for turn in range(300):
+            moves = game.board.legal_moves()
+            roll = rng.random()
+            if roll < 0.4 and moves:
+                command = game.board.command(rng.choice(moves))
+            elif roll < 0.8:
+                source = rng.choice(game.board.columns)
+                command = f'{source}{rng.randint(1, 13)} {rng.choice(game.board.columns)}'
+            elif roll < 0.9:
+                command = f'{rng.choice(["W", "*1", "*2", "*3", "*4"] + game.board.columns)} {rng.choice(["*"] + game.board.columns)}'
+            else:
+                command = 'dd'
+            if game.command(command) == 'won':
+                break
+        while game.undo():
+            pass
+        fresh = main.Game('test', deal)
+        fresh.board.setup()
+        assert game.score == 0
+        assert game.board.hash == fresh.board.hash
+        assert layout(game.board) == layout(fresh.board)
+
+
+def test_same_colour_move_is_refused():
+    game = main.Game('test', 1)
+    game.board.setup()
+    sizes = [collection.size() for collection in game.board.tableau]
+    game.command('C3 A')
+    assert game.moves == []
+    game.command('undo')
+    assert [collection.size() for collection in game.board.tableau] == sizes
+
+
+def test_save_round_trip():
+    # draws through the deck and recycles it, which takes the score below 0 so the move keeps its own points
+    game = main.Game('tester', 7)
+    game.board.setup()
+    for turn in range(30):
+        game.command('dd')
+    assert any(move.deck_recylced and move.points != -100 for move in game.moves)
+    for turn in range(20):
+        moves = game.board.legal_moves()
+        if not moves:
+            break
+        game.command(game.board.command(moves[0]))
+    game.undo()
+    game.undo()
+    assert len(game.undone) == 2
+    data = main.save_game(game)
+    loaded = main.load_game(data)
+    assert loaded.username == game.username
+    assert loaded.board.deck.deal == game.board.deck.deal
+    assert loaded.score == game.score
+    assert loaded.start_time == game.start_time
+    assert loaded.board.hash == game.board.hash
+    assert layout(loaded.board) == layout(game.board)
+    assert [main.encode_move(move) for move in loaded.moves] == [main.encode_move(move) for move in game.moves]
+    assert [main.encode_move(move) for move in loaded.undone] == [main.encode_move(move) for move in game.undone]
+    assert main.save_game(loaded) == data
+    # the moves loaded back can be undone and redone like the ones played
+    while game.redo():
+        loaded.redo()
+    while game.undo():
+        loaded.undo()
+    assert loaded.score == game.score == 0
+    assert layout(loaded.board) == layout(game.board)
+
+
+def test_damaged_save_is_refused():
+    game = main.Game('tester', 3)
+    game.board.setup()
+    game.command('dd')
+    data = bytearray(main.save_game(game))
+    data[len(data) // 2] ^= 0xff
+    with pytest.raises(ValueError):
+        main.load_game(bytes(data))
+
+
+def test_drawing_round_the_deck_is_a_repeat():
+    # after the first trip through the deck has turned its cards over, every trip goes over the same positions again
+    # and recycling draws the first card straight away
+    game, events = main.new_game(2)
+    cycle = game.board.deck.size()
+    repeats = []
+    for turn in range(cycle * (main.REPEAT_LIMIT + 1)):
+        game, events = main.step(game, 'dd')
+        repeats.append([event[1] for event in events if event[0] == 'repeat'])
+    assert not any(repeats[:cycle * (main.REPEAT_LIMIT - 1)])
+    assert all(count and count[0] >= main.REPEAT_LIMIT for count in repeats[-cycle:])
+    game, events = main.step(game, 'undo')
+    assert game.repeats == 0
+    assert not [event for event in events if event[0] == 'repeat']
@@ -0,0 +1,114 @@
+# perfect play tic-tac-toe engine
+# 1. the board is two 9 bit masks, one for each player's pieces (bit = row * 3 + column)
+# 2. every position reachable from an empty board is solved once with negamax and stored against its
+#    canonical key - the smallest key out of the 8 rotations/reflections of the position
+# 3. the solved table is saved next to this file so later runs only have to load it
+# 4. choosing a move is then a table lookup plus turning the stored move back to the board's orientation
+
+import json, os
+
+# the 8 lines of 3 which win the game
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100]
+FULL = 0b111111111
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'minimax_table.json')
+
+# each symmetry of the board as a list of where every cell ends up
+def symmetries():
+    cells = [(row, col) for row in range(3) for col in range(3)]
+    transforms = [lambda r, c: (r, c), lambda r, c: (c, 2 - r), lambda r, c: (2 - r, 2 - c), lambda r, c: (2 - c, r),
+                  lambda r, c: (r, 2 - c), lambda r, c: (2 - r, c), lambda r, c: (c, r), lambda r, c: (2 - c, 2 - r)]
+    result = []
+    for transform in transforms:
+        result.append([transform(row, col)[0] * 3 + transform(row, col)[1] for row, col in cells])
+    return result
+
+SYMMETRIES = symmetries()
+
+# for each symmetry, every 9 bit mask mapped to the mask after the symmetry is applied
+PERMUTED = [[sum(1 << perm[cell] for cell in range(9) if mask >> cell & 1) for mask in range(512)] for perm in SYMMETRIES]
+
+# for each symmetry, where every cell came from, to turn a canonical move back to the real board
+INVERSE = [[perm.index(cell) for cell in range(9)] for perm in SYMMETRIES]
+
+# checks if the pieces in the mask make a line of 3
+def has_won(mask):
+    for line in WIN_MASKS:
+        if mask & line == line:
+            return True
+    return False
+
+# the smallest key out of every symmetry of the position and the symmetry which gives it
+def canonical(x, o):
+    best, best_symmetry = None, 0
+    for symmetry, table in enumerate(PERMUTED):
+        key = table[x] | table[o] << 9
+        if best is None or key < best:
+            best, best_symmetry = key, symmetry
+    return best, best_symmetry
+
+# solves every reachable position, returns a dictionary of canonical key to [value, move]
+# the value is for the player about to move, positive is a win (bigger is sooner), 0 a draw and negative a loss
+def solve():
+    table = {}
+
+    def negamax(mover, other):
+        key, symmetry = canonical(mover, other)
+        if key in table:
+            return table[key][0]
+        empty = FULL & ~(mover | other)
+        if has_won(other):
+            value, move = -(bin(empty).count('1') + 1), -1
+        elif not empty:
+            value, move = 0, -1
+        else:
+            value, move = None, -1
+            for cell in range(9):
+                if empty >> cell & 1:
+                    score = -negamax(other, mover | 1 << cell)
+                    if value is None or score > value:
+                        value, move = score, cell
+            # store the move as it would be on the canonical board
+            move = SYMMETRIES[symmetry][move]
+        table[key] = [value, move]
+        return value
+
+    negamax(0, 0)
+    return table
+
+# loads the solved table from disk, solving and saving it first if it has not been saved yet
+def load_table(path = TABLE_PATH):
+    try:
+        with open(path) as f:
+            return {int(key): value for key, value in json.load(f).items()}
+    except (OSError, ValueError):
+        table = solve()
+        try:
+            # written to a temporary file first so another process never reads half a table
+            with open(path + '.tmp', 'w') as f:
+                json.dump(table, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+        return table
+
+TABLE = None
+
+# the best cell (0-8) for the player about to move, -1 if the game is over
+# mover and other are the masks of the player about to move and their opponent
+def best_move(mover, other):
+    global TABLE
+    if TABLE is None:
+        TABLE = load_table()
+    key, symmetry = canonical(mover, other)
+    move = TABLE[key][1]
+    return INVERSE[symmetry][move] if move != -1 else -1
+
+# turns the 2d board from main.py into the masks for each symbol
+def masks(board, symbols = ('X', 'O')):
+    result = []
+    for symbol in symbols:
+        result.append(sum(1 << (row * 3 + col) for row in range(3) for col in range(3) if board[row][col] == symbol))
+    return result
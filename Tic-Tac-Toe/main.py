@@ -9,18 +9,24 @@
 # B 0 0 0
 # C 0 0 0
 
-import pprint, time, os
+import argparse, pprint, os, sys, string
+
+# the screen module is shared by all the games and lives in the folder above
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import screen, profiling
+import engine, mnk
 
 # creates the initial board, returns a 2d array
-def drawBoard():
-    board = [["#" for cols in range(3)] for rows in range(3)]
+def drawBoard(rows = 3, cols = 3):
+    board = [["#" for col in range(cols)] for row in range(rows)]
     return board
 
 # applies the players move and updates the board
+# rows are lettered from A and columns numbered from 1, e.g. B3 or O15
 def playerMove(playerSymbol, location, board):
-    locations = {"A":0, "B":1, "C":2}
-    if len(location) == 2 and location[0] in locations and int(location[1]) in [1, 2, 3]:
-        position = [locations[location[0]], int(location[1]) - 1]
+    locations = {letter: row for row, letter in enumerate(string.ascii_uppercase[:len(board)])}
+    if len(location) >= 2 and location[0] in locations and location[1:].isdigit() and 1 <= int(location[1:]) <= len(board[0]):
+        position = [locations[location[0]], int(location[1:]) - 1]
         if board[position[0]][position[1]] == "#":
             board[position[0]][position[1]] = playerSymbol
             return board
@@ -69,34 +75,143 @@ def checkFull(board):
                 return False
     return True
 
+# one game played a line at a time, so it can be driven by the terminal or by the server
+# computer is the player (1 or 2) played by the engine, None for two humans
+# rows, cols and k set the size of the board and how many in a row wins, up to 26 rows
+class Session:
+    prompt = ">> "
+
+    def __init__(self, terminal = True, computer = None, rows = 3, cols = 3, k = 3, time_limit = 1.0):
+        self.board, self.players = drawBoard(rows, cols), {1: {'symbol':'X'}, 2: {'symbol':'O'}}
+        self.current_player = True # true for player 1, false for player 2
+        self.terminal = terminal
+        self.computer = computer
+        self.time_limit = time_limit
+        # the engine keeps its own copy of the board so a win is found from just the lines through the last stone
+        self.engine = mnk.Engine(rows, cols, k)
+        self.finished = False
+
+    # every location the player can enter, e.g. A1-A3, B1-B3, C1-C3
+    def locations(self):
+        letters, cols = string.ascii_uppercase[:len(self.board)], len(self.board[0])
+        if len(letters) <= 3:
+            return ", ".join("{0}1-{0}{1}".format(letter, cols) for letter in letters)
+        return "A1-{}{}".format(letters[-1], cols)
+
+    # the board and instructions for the player whose turn it is
+    def display(self, notice = ""):
+        width = len(str(len(self.board[0])))
+        rows = [" ".join(cell.rjust(width) for cell in row) for row in self.board]
+        return screen.page(notice + "  " + " ".join(str(col + 1).rjust(width) for col in range(len(self.board[0]))) + "\n" +
+                           "".join("{} {}\n".format(letter, row) for letter, row in zip(string.ascii_uppercase, rows)) +
+                           "Player {} your move. Enter a location {}.\nType exit to quit the game.".format(1 if self.current_player else 2, self.locations()), self.terminal)
+
+    def start(self):
+        if self.computer == 1:
+            return self.handle(self.computer_move())
+        return self.display()
+
+    # the location the engine would play for the current player
+    # plain tic-tac-toe uses the solved table, any other board is searched
+    def computer_move(self):
+        player = 1 if self.current_player else 2
+        cols = len(self.board[0])
+        with profiling.section("tictactoe.engine"):
+            if (len(self.board), cols, self.engine.k) == (3, 3, 3):
+                mover, other = engine.masks(self.board, (self.players[player]['symbol'], self.players[3 - player]['symbol']))
+                cell = engine.best_move(mover, other)
+            else:
+                cell = self.engine.best_move(player, self.time_limit)
+        return string.ascii_uppercase[cell // cols] + str(cell % cols + 1)
+
+    # plays the location for the current player without drawing anything, returns the events
+    def play(self, location):
+        if location.lower() == "exit":
+            self.finished = True
+            return [("quit",)]
+        player = 1 if self.current_player else 2
+        temp = playerMove(self.players[player]['symbol'], location.upper(), self.board)
+        if temp == -1:
+            return [("invalid", location)]
+        self.board = temp
+        row, col = ord(location[0].upper()) - ord("A"), int(location[1:]) - 1
+        won = self.engine.play(row * len(self.board[0]) + col, player)
+        events = [("move", player, location.upper())]
+        if won or self.engine.is_full():
+            self.finished = True
+            events.append(("won", player) if won else ("draw",))
+            return events
+        self.current_player = not self.current_player
+        return events
+
+    # whether it is the computer's turn to play
+    def computer_turn(self):
+        return not self.finished and self.computer == (1 if self.current_player else 2)
+
+    # plays the location the player entered and returns what to show next
+    def handle(self, location):
+        with profiling.section("tictactoe.play"):
+            events = self.play(location)
+        if events[-1][0] == "quit":
+            return "Quiting game.\n"
+        if events[-1][0] == "invalid":
+            return self.display("Invalid, input please enter in the format {}.\nAlso ensure that spot isn't taken.\n".format(self.locations()))
+        if self.finished:
+            if events[-1][0] == "won":
+                result = "Player {} has won the game.".format(events[-1][1])
+            else:
+                result = "No-one won. Board is full."
+            return screen.page("".join(" ".join(row) + "\n" for row in self.board) + result, self.terminal)
+        # the computer plays straight after the human
+        if self.computer_turn():
+            return self.handle(self.computer_move())
+        return self.display()
+
+# headless game for bots, tests and replaying recorded commands
+# new_game gives the state and events of a new game, step plays one location (and the computer's reply) on it
+# each event is a tuple starting with its name, nothing is drawn
+def new_game(computer = None, rows = 3, cols = 3, k = 3, time_limit = 1.0):
+    session = Session(False, computer, rows, cols, k, time_limit)
+    events = session.play(session.computer_move()) if session.computer_turn() else []
+    return session, events
+
+def step(session, command):
+    if session.finished:
+        return session, []
+    events = session.play(command)
+    if events[-1][0] == "move" and session.computer_turn():
+        events += session.play(session.computer_move())
+    return session, events
+
 # main loop for the game
+# pass 'ai' to play against the computer, or 'ai first' to let the computer go first
+# --size rows cols k plays on a bigger board, e.g. --size 15 15 5 for gomoku
 def game():
-    board, players, playing = drawBoard(), {1: {'symbol':'X'}, 2: {'symbol':'O'}}, True
-    current_player = True # true for player 1, false for player 2
-    while playing:
-        os.system('clear')
-        print("  1 2 3")
-        print("A {}\nB {}\nC {}".format(" ".join(board[0]), " ".join(board[1]), " ".join(board[2])))
-        print("Player {} your move. Enter a location A1-A3, B1-B3, C1-C3.\nType exit to quit the game.".format(1 if current_player else 2))
-        location = input(">> ")
-        if location.lower() != "exit":
-            temp = playerMove(players[1 if current_player else 2]['symbol'], location.upper(), board)
-        else:
-            print("Quiting game.")
-            break
-        if temp != -1:
-            board = temp
-            check = checkBoard(board)
-            if not check:
-                playing = False
-                os.system('clear')
-                print("{}\n{}\n{}".format(" ".join(board[0]), " ".join(board[1]), " ".join(board[2])))
-                if not checkFull(board):
-                    print("Player {} has won the game.".format(1 if current_player else 2))
-                else:
-                    print("No-one won. Board is full.")
-            current_player = not current_player
-        else:
-            print("Invalid, input please enter in the format A1-A3, B1-B3, C1-C3.\nAlso ensure that spot isn't taken.")
-        time.sleep(0.2)
-game()
+    parser = argparse.ArgumentParser(description = "Play tic-tac-toe, or k in a row on a bigger board.")
+    parser.add_argument("ai", nargs = "*", help = "'ai' to play against the computer, 'ai first' to let it go first")
+    parser.add_argument("--size", nargs = 3, type = int, default = [3, 3, 3], metavar = ("ROWS", "COLS", "K"), help = "size of the board and how many in a row wins")
+    parser.add_argument("--time", type = float, default = 1.0, help = "seconds the computer can think for on boards bigger than 3x3")
+    parser.add_argument("--profile", nargs = "?", const = profiling.DEFAULT_PATH, metavar = "FILE", help = "time every move and save a profile to the file on exit")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+    words = [word.lower() for word in args.ai]
+    computer = None
+    if words[:1] == ["ai"]:
+        computer = 1 if words[1:2] == ["first"] else 2
+    rows, cols, k = args.size
+    # rows are entered as letters, so there can be at most 26
+    if not 1 <= rows <= len(string.ascii_uppercase) or cols < 1:
+        parser.error("a board needs 1 to 26 rows and at least 1 column")
+    if not 1 <= k <= max(rows, cols):
+        parser.error("k must be at least 1 and fit along the longer side of the board, or no one can win")
+    session = Session(screen.is_terminal(), computer, rows, cols, k, args.time)
+    sys.stdout.write(session.start())
+    while not session.finished:
+        location = input(session.prompt)
+        with profiling.section("tictactoe.command"):
+            output = session.handle(location)
+        sys.stdout.write(output)
+
+if __name__ == "__main__":
+    game()
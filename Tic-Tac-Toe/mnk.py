@@ -0,0 +1,183 @@
+# engine for m,n,k-games - k in a row on a board of any size (tic-tac-toe is 3,3,3, gomoku is 15,15,5)
+# 1. the board is a flat list of cells, 0 for empty and 1 or 2 for each player
+# 2. every line of k cells (a window) is listed once, and each window keeps a count of each player's stones
+#    placing a stone only updates the windows through that cell, which is also how wins are found
+# 3. the computer searches with alpha-beta, deepening one move at a time until its time runs out,
+#    and remembers positions it has already searched in a transposition table keyed by a zobrist hash
+
+import random, time
+
+WIN = 10 ** 9
+
+class Timeout(Exception):
+    pass
+
+class Engine:
+    def __init__(self, rows, cols, k):
+        self.rows, self.cols, self.k = rows, cols, k
+        self.cells = [0] * (rows * cols)
+        self.stones = 0
+        # every window of k cells in a row, column or diagonal
+        self.windows = []
+        for row in range(rows):
+            for col in range(cols):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                    if 0 <= end_row < rows and 0 <= end_col < cols:
+                        self.windows.append([(row + d_row * i) * cols + col + d_col * i for i in range(k)])
+        # the windows through each cell, and the stones each player has in every window
+        self.cell_windows = [[] for cell in self.cells]
+        for index, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(index)
+        self.counts = [[0, 0, 0] for window in self.windows]
+        # value of the position for player 1, kept up to date as stones are placed and removed
+        self.score = 0
+        self.hash = 0
+        rng = random.Random(0)
+        self.keys = [[0] * 3 for cell in self.cells]
+        for keys in self.keys:
+            keys[1], keys[2] = rng.getrandbits(64), rng.getrandbits(64)
+        self.table = {}
+
+    # value of a window for player 1, a window with stones from both players can never be won
+    def window_value(self, counts):
+        if counts[1] and counts[2]:
+            return 0
+        if counts[1]:
+            return 4 ** counts[1]
+        if counts[2]:
+            return -(4 ** counts[2])
+        return 0
+
+    # places a stone for the player, returns True if it makes k in a row
+    def play(self, cell, player):
+        self.cells[cell] = player
+        self.stones += 1
+        self.hash ^= self.keys[cell][player]
+        won = False
+        for index in self.cell_windows[cell]:
+            counts = self.counts[index]
+            self.score -= self.window_value(counts)
+            counts[player] += 1
+            self.score += self.window_value(counts)
+            if counts[player] == self.k:
+                won = True
+        return won
+
+    # takes a stone back off the board
+    def undo(self, cell, player):
+        self.cells[cell] = 0
+        self.stones -= 1
+        self.hash ^= self.keys[cell][player]
+        for index in self.cell_windows[cell]:
+            counts = self.counts[index]
+            self.score -= self.window_value(counts)
+            counts[player] -= 1
+            self.score += self.window_value(counts)
+
+    def is_full(self):
+        return self.stones == len(self.cells)
+
+    # empty cells next to (within 2 of) a stone, on large boards moves far from the action are not worth searching
+    def candidates(self):
+        if self.stones == 0:
+            return [(self.rows // 2) * self.cols + self.cols // 2]
+        result = []
+        for cell, value in enumerate(self.cells):
+            if value:
+                continue
+            row, col = divmod(cell, self.cols)
+            near = False
+            for r in range(max(row - 2, 0), min(row + 3, self.rows)):
+                for c in range(max(col - 2, 0), min(col + 3, self.cols)):
+                    if self.cells[r * self.cols + c]:
+                        near = True
+                        break
+                if near:
+                    break
+            if near:
+                result.append(cell)
+        return result
+
+    # how much a cell is worth to either player, used to try the most promising moves first
+    def urgency(self, cell):
+        value = 0
+        for index in self.cell_windows[cell]:
+            counts = self.counts[index]
+            if not counts[2]:
+                value += 4 ** counts[1]
+            if not counts[1]:
+                value += 4 ** counts[2]
+        return value
+
+    def negamax(self, player, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise Timeout()
+        original_alpha = alpha
+        entry = self.table.get(self.hash)
+        best_move = None
+        if entry is not None:
+            entry_depth, value, flag, best_move = entry
+            if entry_depth >= depth:
+                if flag == 0:
+                    return value
+                elif flag == 1:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        if depth == 0:
+            return self.score if player == 1 else -self.score
+        moves = sorted(self.candidates(), key = self.urgency, reverse = True)
+        # the best move found last time this position was searched is tried first
+        if best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+        best, best_move = -WIN * 2, moves[0]
+        for cell in moves:
+            # the stone is always taken back off, even when the search runs out of time
+            try:
+                if self.play(cell, player):
+                    # sooner wins are worth more
+                    value = WIN - ply
+                elif self.is_full():
+                    value = 0
+                else:
+                    value = -self.negamax(3 - player, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self.undo(cell, player)
+            if value > best:
+                best, best_move = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        flag = 0 if original_alpha < best < beta else (1 if best >= beta else 2)
+        self.table[self.hash] = (depth, best, flag, best_move)
+        return best
+
+    # the cell the player should play, searching deeper until the time limit or max depth is reached
+    def best_move(self, player, time_limit = 1.0, max_depth = None):
+        moves = sorted(self.candidates(), key = self.urgency, reverse = True)
+        # take a winning move straight away
+        for cell in moves:
+            won = self.play(cell, player)
+            self.undo(cell, player)
+            if won:
+                return cell
+        self.deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+        best = moves[0]
+        depth = 1
+        empty = len(self.cells) - self.stones
+        while depth <= empty and (max_depth is None or depth <= max_depth):
+            try:
+                self.negamax(player, depth, -WIN * 2, WIN * 2, 0)
+            except Timeout:
+                # keep the move from the last search which finished
+                break
+            best = self.table[self.hash][3]
+            depth += 1
+        return best
@@ -0,0 +1,17 @@
+# timings of blackjack's hand values and building a deck
+
+from server import load
+
+blackjack = load('blackjack', 'Blackjack', 'main.py')
+
+def bench_hand_value(benchmark):
+    hand = blackjack.Hand()
+    for card in blackjack.CARDS[:3]:
+        hand.add(card)
+    benchmark(hand.hand_value)
+
+def bench_deck(benchmark):
+    benchmark(blackjack.Deck)
+
+def bench_deck_deal(benchmark):
+    benchmark(blackjack.Deck, 1234)
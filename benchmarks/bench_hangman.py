@@ -0,0 +1,20 @@
+# timings of guessing letters in hangman
+
+from server import load
+
+hangman = load('hangman', 'Hangman', 'main.py')
+
+# a whole game, every guess revealing the letter wherever it appears in the word
+def bench_reveal(benchmark):
+    def play():
+        session = hangman.new_game('mississippi')[0]
+        for letter in 'spim':
+            hangman.step(session, letter)
+    benchmark(play)
+
+def bench_miss(benchmark):
+    def play():
+        session = hangman.new_game('rhythm')[0]
+        for letter in 'aeiou':
+            hangman.step(session, letter)
+    benchmark(play)
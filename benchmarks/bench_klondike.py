@@ -0,0 +1,70 @@
+# timings of the klondike board: every kind of move, drawing from the deck and drawing the board
+
+import io, random
+
+from server import load
+
+klondike = load('klondike', 'Klondike', 'main.py')
+
+KINDS = [('waste', 'tableau'), ('waste', 'foundation'), ('tableau', 'foundation'), ('tableau', 'tableau'), ('foundation', 'tableau')]
+
+# a board where a kind of move can be made and the move, found by playing random legal moves on seeded deals
+def position(kind, attempts = 200):
+    rng = random.Random(1)
+    for deal in range(attempts):
+        board = klondike.new_game(deal)[0].board
+        for turn in range(300):
+            moves = board.legal_moves()
+            for move in moves:
+                if (move.initial, move.destination) == kind:
+                    return board, board.command(move).split()
+            # prefer moving over drawing so the foundations fill up, drawing when nothing else can be done
+            if moves and rng.random() < 0.7:
+                move = rng.choice(moves)
+                board.move(*board.command(move).split())
+            else:
+                board.draw(klondike.Move('deck', 'waste'))
+    raise RuntimeError(f'no position found for a {kind[0]} to {kind[1]} move')
+
+# times a move and undoing it, so the board is the same for every call
+def time_move(benchmark, kind):
+    board, (a, b) = position(kind)
+    def round_trip():
+        board.revert(board.move(a, b))
+    benchmark(round_trip)
+
+def bench_move_waste_tableau(benchmark):
+    time_move(benchmark, KINDS[0])
+
+def bench_move_waste_foundation(benchmark):
+    time_move(benchmark, KINDS[1])
+
+def bench_move_tableau_foundation(benchmark):
+    time_move(benchmark, KINDS[2])
+
+def bench_move_tableau_tableau(benchmark):
+    time_move(benchmark, KINDS[3])
+
+def bench_move_foundation_tableau(benchmark):
+    time_move(benchmark, KINDS[4])
+
+# draws through the deck, turning the waste over onto the deck each time it runs out
+def bench_draw(benchmark):
+    board = klondike.new_game(0)[0].board
+    benchmark(lambda: board.draw(klondike.Move('deck', 'waste')))
+
+def bench_frame(benchmark):
+    board = position(KINDS[3])[0]
+    benchmark(board.frame, 'bench', 100)
+
+# the whole board drawn with escape codes, as when the screen is cleared
+def bench_display(benchmark):
+    board = position(KINDS[3])[0]
+    output = io.StringIO()
+    board.renderer = klondike.Renderer(output, True)
+    def display():
+        board.renderer.reset()
+        board.display('bench', 100)
+        output.seek(0)
+        output.truncate()
+    benchmark(display)
@@ -0,0 +1,13 @@
+# timings of checking a tic-tac-toe board for a win
+
+from server import load
+
+tictactoe = load('tic-tac-toe', 'Tic-Tac-Toe', 'main.py')
+
+def bench_check_board(benchmark):
+    # a full board with no winner, so every check runs to the end
+    board = [list('XOX'), list('XOO'), list('OXX')]
+    benchmark(tictactoe.checkBoard, board)
+
+def bench_check_board_empty(benchmark):
+    benchmark(tictactoe.checkBoard, tictactoe.drawBoard())
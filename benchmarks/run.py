@@ -0,0 +1,129 @@
+""" Benchmark runner for the hot paths of every game.
+
+Every bench_*.py file in this folder holds cases, functions starting with 'bench_' which are passed
+a benchmark and call it once with the code to time, the same way pytest-benchmark cases are written:
+
+    def bench_hand_value(benchmark):
+        hand = ...
+        benchmark(hand.hand_value)
+
+Each case is run enough times that a round takes at least --min-time, over several rounds, and the
+median time per call is kept. --save writes the results to a JSON baseline, and every later run is
+compared with that baseline and fails when a case is slower than it by more than --threshold.
+
+Usage: python3 benchmarks/run.py --save
+       python3 benchmarks/run.py --threshold 0.25 -k klondike
+"""
+
+import argparse, glob, importlib.util, json, os, statistics, sys, time
+
+folder = os.path.dirname(os.path.abspath(__file__))
+# the cases load the games with the server's loader, which lives in the folder above
+sys.path.append(os.path.join(folder, '..'))
+
+BASELINE_PATH = os.path.join(folder, 'baseline.json')
+
+
+class Benchmark:
+    """ Class passed to each case to time the code it is given.
+
+    Attributes:
+        rounds: the number of rounds to time
+        min_time: the shortest a round can take, calls are added to a round until it takes this long
+        result: the timings of the last code timed, None until the case has called the benchmark
+    """
+
+    def __init__(self, rounds, min_time):
+        self.rounds = rounds
+        self.min_time = min_time
+        self.result = None
+
+    def time(self, function, args, number):
+        start = time.perf_counter()
+        for i in range(number):
+            function(*args)
+        return time.perf_counter() - start
+
+    def __call__(self, function, *args):
+        # double the calls in a round until a round is long enough to time reliably
+        number = 1
+        while self.time(function, args, number) < self.min_time:
+            number *= 2
+        times = [self.time(function, args, number) / number for i in range(self.rounds)]
+        self.result = {'median': statistics.median(times), 'min': min(times), 'mean': statistics.mean(times),
+                       'stddev': statistics.stdev(times) if len(times) > 1 else 0.0, 'calls': number, 'rounds': self.rounds}
+        return function(*args)
+
+
+def cases(pattern):
+    # every case in the bench files, as (name, function), the name is the file and the case
+    found = []
+    for path in sorted(glob.glob(os.path.join(folder, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        for name in dir(module):
+            function = getattr(module, name)
+            if name.startswith('bench_') and callable(function):
+                full_name = f'{module_name[6:]}.{name[6:]}'
+                if pattern is None or pattern in full_name:
+                    found.append((full_name, function))
+    return found
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Time the hot paths of the games and compare them with a baseline.')
+    parser.add_argument('-k', dest = 'pattern', default = None, help = 'only run cases with this in their name')
+    parser.add_argument('--rounds', type = int, default = 7, help = 'rounds to time each case over')
+    parser.add_argument('--min-time', type = float, default = 0.02, help = 'shortest time in seconds for one round')
+    parser.add_argument('--baseline', default = BASELINE_PATH, help = 'JSON file of baseline results')
+    parser.add_argument('--save', action = 'store_true', help = 'save the results as the baseline')
+    parser.add_argument('--threshold', type = float, default = 0.25, help = 'how much slower than the baseline a case can be, 0.25 is 25%%')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, function in cases(args.pattern):
+        benchmark = Benchmark(args.rounds, args.min_time)
+        function(benchmark)
+        if benchmark.result is None:
+            print(f'{name:<40} did not call the benchmark', file = sys.stderr)
+            continue
+        results[name] = benchmark.result
+        median = benchmark.result['median']
+        line = f'{name:<40}{format_time(median):>12}  (min {format_time(benchmark.result["min"])}, {benchmark.result["calls"]} calls x {args.rounds})'
+        if name in baseline and not args.save:
+            change = median / baseline[name]['median'] - 1
+            line += f'  {change:+.1%} vs baseline'
+            if change > args.threshold:
+                regressions.append(name)
+                line += '  REGRESSED'
+        print(line)
+
+    if args.save:
+        # cases which were not run this time keep their old baseline
+        baseline.update(results)
+        with open(args.baseline + '.tmp', 'w') as f:
+            json.dump(baseline, f, indent = 2, sort_keys = True)
+        os.replace(args.baseline + '.tmp', args.baseline)
+        print(f'Saved {len(results)} results to {args.baseline}')
+    elif regressions:
+        print(f'{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: {", ".join(regressions)}', file = sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
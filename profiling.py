@@ -0,0 +1,186 @@
+""" Opt-in profiling shared by all of the games.
+
+Turned on by setting the GAMES_PROFILE environment variable (to 1, or to the file the profile should be
+saved to) or by starting a game with --profile, and costs nothing but a function call when it is off.
+While it is on:
+
+    - every section of code wrapped in `with profiling.section(name):` has its time recorded in a latency
+      histogram, along with how many more memory blocks were allocated when it finished than when it started
+    - tracemalloc follows every allocation, the lines which allocated the most blocks are listed on exit
+    - cProfile profiles every call, saved on exit to a file pstats, snakeviz or flameprof can read
+
+The histograms and allocations are written to stderr when the program exits. Tracing every allocation
+and call slows everything down, so the times are for comparing sections with each other, not for
+comparing with times taken with profiling off.
+
+Each game lives in its own folder, so they add the folder above to sys.path to import this.
+"""
+
+import atexit, contextlib, cProfile, os, sys, time, tracemalloc
+
+ENV = 'GAMES_PROFILE'
+DEFAULT_PATH = 'games.prof'
+
+# the upper bound of each histogram bucket in microseconds, anything slower goes in a last bucket
+BUCKETS = [2 ** i for i in range(21)]
+
+# most allocation sites listed on exit
+TOP_ALLOCATIONS = 10
+
+enabled = False
+# the histogram of every section timed so far, by name
+histograms = {}
+profiler = None
+profile_path = None
+# a section which does nothing, handed out while profiling is off
+off = contextlib.nullcontext()
+
+
+class Histogram:
+    """ Class counting how long a section took in buckets of powers of two microseconds
+
+    Attributes:
+        counts: how many times fell into each bucket, the last is for times slower than every bucket
+        calls: how many times the section ran
+        total: the time taken by every call added together, in seconds
+        slowest: the longest a call took, in seconds
+        blocks: memory blocks left allocated by every call added together
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.calls = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.blocks = 0
+
+    def add(self, seconds, blocks):
+        micro = seconds * 1e6
+        bucket = 0
+        while bucket < len(BUCKETS) and micro > BUCKETS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.calls += 1
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.blocks += blocks
+
+    def percentile(self, fraction):
+        # the upper bound of the bucket the call at that fraction of the calls falls in, in microseconds
+        wanted = fraction * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                return min(BUCKETS[bucket], self.slowest * 1e6) if bucket < len(BUCKETS) else self.slowest * 1e6
+        return 0
+
+
+class Section:
+    """ Class timing one run of a section of code, used as a context manager """
+
+    __slots__ = ('name', 'start', 'blocks')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        histogram = histograms.get(self.name)
+        if histogram is None:
+            histogram = histograms[self.name] = Histogram()
+        histogram.add(elapsed, sys.getallocatedblocks() - self.blocks)
+        return False
+
+
+def section(name):
+    # a context manager timing the code inside it while profiling is on, and doing nothing while it is off
+    return Section(name) if enabled else off
+
+
+def enable(path = DEFAULT_PATH):
+    """ Function turning profiling on for the rest of the program
+
+    Arguments:
+        path: the file the cProfile stats are saved to on exit
+    """
+
+    global enabled, profiler, profile_path
+    if enabled:
+        return
+    enabled = True
+    profile_path = path
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    atexit.register(finish)
+
+
+def take_flag(args):
+    # removes --profile or --profile=PATH from a list of arguments and turns profiling on if it was there
+    remaining = []
+    for arg in args:
+        if arg == '--profile':
+            enable()
+        elif arg.startswith('--profile='):
+            enable(arg.split('=', 1)[1])
+        else:
+            remaining.append(arg)
+    return remaining
+
+
+def format_time(micro):
+    return f'{micro / 1000:.1f}ms' if micro >= 1000 else f'{micro:.0f}us'
+
+
+def report(stream = None):
+    # writes the latency of every section and the lines which allocated the most blocks
+    stream = stream or sys.stderr
+    lines = [f'{"section":<24}{"calls":>8}{"mean":>10}{"p50":>10}{"p90":>10}{"p99":>10}{"max":>10}{"blocks/call":>13}']
+    for name, histogram in sorted(histograms.items()):
+        mean = histogram.total / histogram.calls * 1e6
+        lines.append(f'{name:<24}{histogram.calls:>8}{format_time(mean):>10}'
+                     + ''.join(f'{format_time(histogram.percentile(p)):>10}' for p in (0.5, 0.9, 0.99))
+                     + f'{format_time(histogram.slowest * 1e6):>10}{histogram.blocks / histogram.calls:>13.1f}')
+    for name, histogram in sorted(histograms.items()):
+        # only the buckets from the fastest to the slowest call are shown
+        used = [bucket for bucket, count in enumerate(histogram.counts) if count]
+        cells = []
+        for bucket in range(used[0], used[-1] + 1):
+            bound = f'<={format_time(BUCKETS[bucket])}' if bucket < len(BUCKETS) else 'slower'
+            cells.append(f'{bound} {histogram.counts[bucket]}')
+        lines.append(f'{name}: ' + ', '.join(cells))
+    if tracemalloc.is_tracing():
+        lines.append('Lines with the most memory blocks still allocated:')
+        # the allocations made to keep the profile are left out
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+        stats = sorted(snapshot.statistics('lineno'), key = lambda stat: stat.count, reverse = True)
+        for stat in stats[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            lines.append(f'  {stat.count:>8} blocks {stat.size / 1024:>9.1f}KiB  {frame.filename}:{frame.lineno}')
+    stream.write('\n'.join(lines) + '\n')
+
+
+def finish():
+    # stops profiling, reports what was recorded and saves the cProfile stats
+    global enabled
+    if profiler is not None:
+        profiler.disable()
+    report()
+    tracemalloc.stop()
+    if profiler is not None:
+        try:
+            profiler.dump_stats(profile_path)
+            sys.stderr.write(f'Profile saved to {profile_path}, view it with e.g. python3 -m pstats {profile_path} or snakeviz\n')
+        except OSError as error:
+            sys.stderr.write(f'Could not save the profile to {profile_path}: {error}\n')
+    enabled = False
+
+
+if os.environ.get(ENV):
+    enable(DEFAULT_PATH if os.environ[ENV] == '1' else os.environ[ENV])
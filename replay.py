@@ -0,0 +1,98 @@
+""" Replays recorded commands through the games with no terminal, as fast as they can be played.
+
+Every game's main.py has a headless core: new_game(**options) starts a game and step(state, command)
+plays one command on it, each handing back the events that happened instead of drawing a screen.
+A recording is a line of JSON naming the game, the options to start it with and the commands to play:
+
+    {"game": "klondike", "options": {"deal": 5}, "commands": ["dd", "C4 A", "undo"]}
+
+The events of every recording can be saved with --record and compared against later with --check,
+so any change to how a game plays shows up as a difference in its events. --repeat plays all of the
+recordings over and over to measure how many steps a second the games can take.
+
+Usage: python3 replay.py recordings.jsonl --repeat 1000 --check expected.jsonl
+"""
+
+import argparse, json, sys, time
+
+from server import load
+
+# folder of each game, by the name used in recordings
+folders = {'blackjack': 'Blackjack', 'hangman': 'Hangman', 'klondike': 'Klondike', 'tic-tac-toe': 'Tic-Tac-Toe'}
+
+
+def replay(module, recording):
+    # plays one recording, returns the events of every step starting with those of the new game
+    state, events = module.new_game(**recording.get('options', {}))
+    steps = [events]
+    for command in recording['commands']:
+        state, events = module.step(state, command)
+        steps.append(events)
+    return steps
+
+
+def compare(index, got, expected):
+    # tells the user where a recording's events first differ from the ones expected, returns True if they match
+    if got == expected:
+        return True
+    got, expected = json.loads(got), json.loads(expected)
+    for step, (a, b) in enumerate(zip(got, expected)):
+        if a != b:
+            print(f'Recording {index + 1} differs at step {step}: expected {b}, got {a}', file = sys.stderr)
+            return False
+    print(f'Recording {index + 1} has {len(got)} steps, expected {len(expected)}', file = sys.stderr)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Replay recorded commands through the games without a terminal.')
+    parser.add_argument('recordings', help = 'file with a recording on each line')
+    parser.add_argument('--repeat', type = int, default = 1, help = 'times to play every recording')
+    parser.add_argument('--record', default = None, help = 'file to save the events of every recording to')
+    parser.add_argument('--check', default = None, help = 'file of events saved with --record to compare against')
+    args = parser.parse_args()
+
+    with open(args.recordings) as f:
+        recordings = [json.loads(line) for line in f if line.strip()]
+    modules = {}
+    for recording in recordings:
+        name = recording['game']
+        if name not in folders:
+            parser.error(f'unknown game {name}, expected one of {", ".join(folders)}')
+        if name not in modules:
+            modules[name] = load(name, folders[name], 'main.py')
+
+    results = []
+    steps = 0
+    start_time = time.perf_counter()
+    for i in range(args.repeat):
+        for recording in recordings:
+            events = replay(modules[recording['game']], recording)
+            steps += len(events) - 1
+            if i == 0:
+                results.append(events)
+    elapsed = time.perf_counter() - start_time
+
+    # events are compared as json, so it does not matter that they are tuples here and lists once saved
+    output = [json.dumps(events) for events in results]
+    if args.record:
+        with open(args.record, 'w') as f:
+            f.write(''.join(line + '\n' for line in output))
+    failures = 0
+    if args.check:
+        with open(args.check) as f:
+            expected = [line.rstrip('\n') for line in f if line.strip()]
+        if len(expected) != len(output):
+            print(f'Expected events for {len(expected)} recordings, played {len(output)}', file = sys.stderr)
+            failures += 1
+        for index, (got, want) in enumerate(zip(output, expected)):
+            if not compare(index, got, want):
+                failures += 1
+
+    print(f'{steps} steps from {len(recordings)} recordings x{args.repeat} in {elapsed:.3f}s '
+          f'({steps / max(elapsed, 1e-9):.0f} steps/s)', file = sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
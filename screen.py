@@ -0,0 +1,132 @@
+""" Terminal screen helpers shared by all of the games.
+
+The screen is cleared with ANSI escape codes rather than by running the 'clear' or 'cls'
+command, and everything for a redraw is written in one go. When the output is not a
+terminal (e.g. piped to a file or another program) no escape codes are written at all.
+
+Each game lives in its own folder, so they add the folder above to sys.path to import this.
+"""
+
+import re, sys
+
+import profiling
+
+# escape code to clear the screen and move the cursor to the top left
+CLEAR = '\u001b[2J\u001b[H'
+
+# matches the colour codes which take up no space on the screen
+ansi_pattern = re.compile('\u001b\\[[0-9;]*m')
+
+
+def enable_ansi():
+    # windows terminals only understand escape codes once virtual terminal processing is turned on
+    if sys.platform != 'win32':
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+    except Exception:
+        pass
+
+
+def is_terminal(stream = None):
+    # checks if the stream is a terminal which will understand escape codes
+    stream = stream or sys.stdout
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def clear(stream = None):
+    # clears the screen, when the output is not a terminal there is nothing to clear
+    stream = stream or sys.stdout
+    if is_terminal(stream):
+        stream.write(CLEAR)
+        stream.flush()
+
+
+def page(text, terminal):
+    # a full screen of text, starting with the code to clear the screen when it is going to a terminal
+    return (CLEAR if terminal else '') + text + '\n'
+
+
+def show(text, stream = None):
+    # clears the screen and writes the text in a single write so the screen does not flicker
+    stream = stream or sys.stdout
+    with profiling.section('screen.write'):
+        stream.write(page(text, is_terminal(stream)))
+        stream.flush()
+
+
+class Renderer:
+    """ Class which draws frames to the terminal, only redrawing the cells which changed.
+
+    A frame is a list of rows and each row is a list of cells (strings which may contain
+    colour codes). Cells are compared with the last frame drawn and only the ones which
+    differ are written, using escape codes to move the cursor to them, in a single write.
+    When the output is not a terminal every frame is written out in full without any codes.
+
+    Attributes:
+        previous: the last frame drawn, None when the screen needs to be drawn in full
+        output: the stream the frames are written to
+        terminal: whether the output is a terminal
+    """
+
+    def __init__(self, output = None, terminal = None):
+        self.previous = None
+        self.output = output or sys.stdout
+        self.terminal = is_terminal(self.output) if terminal is None else terminal
+
+    def reset(self):
+        # forget the last frame so the next one clears the screen and is drawn in full
+        self.previous = None
+
+    def width(cell):
+        # the number of columns a cell takes up on the screen
+        return len(ansi_pattern.sub('', cell))
+
+    def move_to(row, column):
+        # escape code to move the cursor, rows and columns start at 1
+        return f'\u001b[{row + 1};{column + 1}H'
+
+    def draw(self, frame):
+        if not self.terminal:
+            self.output.write('\n'.join(ansi_pattern.sub('', ''.join(row)) for row in frame) + '\n')
+            self.output.flush()
+            return
+        output = []
+        previous = self.previous
+        if previous is None:
+            output.append(CLEAR)
+            previous = []
+        for i, row in enumerate(frame):
+            old = previous[i] if i < len(previous) else []
+            if row == old:
+                continue
+            widths = [Renderer.width(cell) for cell in row]
+            # when every cell takes up the same space as before only the cells which changed are written
+            if len(row) == len(old) and widths == [Renderer.width(cell) for cell in old]:
+                column = 0
+                for cell, old_cell, width in zip(row, old, widths):
+                    if cell != old_cell:
+                        output.append(Renderer.move_to(i, column) + cell)
+                    column += width
+            # otherwise the line is written from the first cell which changed and the rest of the old line cleared
+            else:
+                first = 0
+                while first < len(row) and first < len(old) and row[first] == old[first]:
+                    first += 1
+                output.append(Renderer.move_to(i, sum(widths[:first])) + ''.join(row[first:]) + '\u001b[K')
+        # leave the cursor below the frame and clear anything left over from a taller frame
+        output.append(Renderer.move_to(len(frame), 0) + '\u001b[J')
+        self.output.write(''.join(output))
+        self.output.flush()
+        self.previous = frame
+
+
+enable_ansi()
@@ -0,0 +1,129 @@
+""" Server hosting all of the games over TCP, with many players at once in a single process.
+
+Connect with telnet or netcat, e.g. 'telnet localhost 2323', pick a game from the menu and
+play it the same way as in the terminal. Every connection gets its own session object from
+the game's main.py which is driven by the lines the player sends, so no game ever waits on
+input() and one process can serve as many players as it has memory for.
+
+Usage: python3 server.py --host 0.0.0.0 --port 2323
+"""
+
+import argparse, asyncio, importlib.util, os, sys, traceback
+
+# name, folder, file and session class of each game, listed in the order they appear in the menu
+games = [('Blackjack', 'Blackjack', 'main.py', 'Session'),
+         ('Blackjack table', 'Blackjack', 'table.py', 'Session'),
+         ('Hangman', 'Hangman', 'main.py', 'Session'),
+         ('Hangman solo', 'Hangman', 'main.py', 'Solo'),
+         ('Klondike', 'Klondike', 'main.py', 'Session'),
+         ('Tic-Tac-Toe', 'Tic-Tac-Toe', 'main.py', 'Session')]
+
+menu = 'Python CLI Games\n' + ''.join(f'{i + 1}. {game[0]}\n' for i, game in enumerate(games)) + 'Type a number to play or \'quit\' to leave: '
+
+
+def load(name, folder, file):
+    # most games are in a file called main.py so each is loaded under its own module name
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), folder)
+    spec = importlib.util.spec_from_file_location(name.lower().replace('-', '_').replace(' ', '_'), os.path.join(directory, file))
+    module = importlib.util.module_from_spec(spec)
+    # the game's folder is on the path while it loads so it can import the other files next to it
+    sys.path.insert(0, directory)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+    return module
+
+
+class Server:
+    """ Class representing the server and the games it hosts.
+
+    Attributes:
+        games: dictionary of menu choice to the game's Session class
+        timeout: seconds a player can be idle before they are disconnected, None for no limit
+        sessions: the number of players connected
+    """
+
+    def __init__(self, timeout = None):
+        self.games = {str(i + 1): getattr(load(name, folder, file), session) for i, (name, folder, file, session) in enumerate(games)}
+        self.timeout = timeout
+        self.sessions = 0
+
+    async def send(self, writer, text):
+        # telnet expects a carriage return with every new line
+        writer.write(text.replace('\n', '\r\n').encode())
+        await writer.drain()
+
+    async def receive(self, reader):
+        # reads the next line from the player, None when they have disconnected or been idle too long
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        if not line:
+            return None
+        return line.decode('utf-8', 'ignore').strip()
+
+    async def play(self, reader, writer, session):
+        # returns False if the player went away during the game
+        # a game can end as it starts, like solo hangman with no word list, and then there is nothing to prompt for
+        output = session.start()
+        await self.send(writer, output + ('' if session.finished else session.prompt))
+        while not session.finished:
+            line = await self.receive(reader)
+            if line is None:
+                return False
+            output = session.handle(line)
+            await self.send(writer, output + ('' if session.finished else session.prompt))
+        return True
+
+    async def connect(self, reader, writer):
+        # runs for each player that connects, showing the menu until they leave
+        self.sessions += 1
+        try:
+            while True:
+                await self.send(writer, menu)
+                choice = await self.receive(reader)
+                if choice is None or choice.lower() == 'quit':
+                    break
+                if choice not in self.games:
+                    continue
+                try:
+                    if not await self.play(reader, writer, self.games[choice](True)):
+                        break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception:
+                    # a bug in one game should only end that game, not the server or anyone else's session
+                    traceback.print_exc()
+                    await self.send(writer, '\nSomething went wrong, the game has ended.\n')
+                await self.send(writer, '\n')
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.connect, host, port)
+        print(f'Serving games on {host}:{port}', file = sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Host the games over TCP.')
+    parser.add_argument('--host', default = '0.0.0.0', help = 'address to listen on')
+    parser.add_argument('--port', type = int, default = 2323, help = 'port to listen on')
+    parser.add_argument('--timeout', type = float, default = 600, help = 'seconds a player can be idle before being disconnected, 0 for no limit')
+    args = parser.parse_args()
+
+    server = Server(args.timeout or None)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()